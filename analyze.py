@@ -0,0 +1,206 @@
+"""Headless bulk analysis: streams FEN or EPD lines through the engine pool and writes one JSON line
+per position (best move, score, depth reached, ...) in input order.
+
+Only a small window of positions is in flight at a time, so memory stays flat on files with millions
+of lines. A checkpoint next to the output records how far the run got; --resume carries on from there.
+
+Examples:
+    python analyze.py positions.epd --depth 12 --output analysis.jsonl
+    python analyze.py positions.epd --depth 12 --output analysis.jsonl --resume
+    cat games.fen | python analyze.py - --movetime 200 --workers 4
+    python analyze.py positions.epd --depth 5 --engine builtin
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from data.classes.EnginePool import EnginePool
+from data.classes.Position import Position
+from data.classes.Search import Search
+
+ANALYSIS_ENGINE_OPTIONS = {"Threads": 1, "Hash": 64}  # one core per engine process
+
+
+def parse_line(line):
+    """Splits a FEN or EPD line into (FEN, EPD operations dict). Raises ValueError if it's not a position."""
+    fields = line.split(None, 6)
+    if len(fields) < 4:
+        raise ValueError(f"expected at least 4 FEN fields, got {len(fields)}")
+    operations = {}
+    if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+        clocks = fields[4:6]
+    else:
+        # EPD: the 4 position fields are followed by operations like 'bm Nf3; id "pos 1";'
+        for operation in ' '.join(fields[4:]).split(';'):
+            opcode, _, operand = operation.strip().partition(' ')
+            if opcode:
+                operations[opcode] = operand.strip().strip('"')
+        clocks = [operations.get('hmvc', '0'), operations.get('fmvn', '1')]
+    fen = ' '.join(fields[:4] + clocks)
+    Position.from_fen(fen)  # validate before it reaches the engine
+    return fen, operations
+
+
+def read_positions(stream, number=0, offset=0, skip=0):
+    """Yields (line number, byte offset after the line, text) for every non-blank line.
+
+    number and offset say where the stream already is (e.g. after seeking a file); skip drops that
+    many lines first (for streams that can't seek).
+    """
+    for raw in stream:
+        number += 1
+        offset += len(raw)
+        if number <= skip:
+            continue
+        text = raw.decode('utf-8', 'replace').strip()
+        if text and not text.startswith('#'):
+            yield number, offset, text
+
+
+def make_record(number, text, search):
+    record = {"line": number}
+    parsed, future = search
+    if future is None:
+        record.update({"input": text, "error": str(parsed)})
+        return record
+    fen, operations = parsed
+    record["fen"] = fen
+    if 'id' in operations:
+        record["id"] = operations['id']
+    try:
+        best_move, info = future.result()
+    except Exception as e:
+        record["error"] = f"engine: {e}"
+        return record
+    score = info.get("score")
+    record.update({
+        "best_move": best_move, "score": list(score) if score else None,
+        "depth": info.get("depth"), "seldepth": info.get("seldepth"), "nodes": info.get("nodes"),
+        "time_ms": info.get("time"), "pv": info.get("pv", []),
+    })
+    return record
+
+
+class Checkpoint:
+    """How far a run has got: input lines and bytes consumed, and bytes of output written for them."""
+    def __init__(self, path):
+        self.path = path
+        self.lines = 0
+        self.input_offset = 0
+        self.output_size = 0
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            self.lines, self.input_offset, self.output_size = state["lines"], state["input_offset"], state["output_size"]
+
+    def save(self):
+        # Write then rename, so a crash can't leave a half-written checkpoint
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"lines": self.lines, "input_offset": self.input_offset, "output_size": self.output_size}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def analyse(pool, positions, output, checkpoint, depth, movetime, window, checkpoint_every):
+    """Runs every position through the pool, writing results in input order. Returns the count written."""
+    in_flight = deque()  # (line number, byte offset after line, text, (parse result or error, future))
+    written = 0
+    started = time.perf_counter()
+
+    def write_oldest():
+        nonlocal written
+        number, offset, text, search = in_flight.popleft()
+        output.write(json.dumps(make_record(number, text, search)) + "\n")
+        written += 1
+        checkpoint.lines, checkpoint.input_offset = number, offset
+        if written % checkpoint_every == 0:
+            output.flush()
+            checkpoint.output_size = output.tell()
+            checkpoint.save()
+            rate = written / (time.perf_counter() - started)
+            print(f"{written} positions, line {number} ({rate:.1f}/s)", file=sys.stderr)
+
+    try:
+        for number, offset, text in positions:
+            try:
+                fen, operations = parse_line(text)
+                future = pool.submit(fen, depth=depth, movetime=movetime)
+                search = ((fen, operations), future)
+            except ValueError as e:
+                search = (e, None)
+            in_flight.append((number, offset, text, search))
+            # Backpressure: wait for the oldest search once the window is full
+            while len(in_flight) >= window:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+    finally:
+        pool.cancel_all()
+        output.flush()
+        checkpoint.output_size = output.tell()
+        checkpoint.save()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse a stream of FEN/EPD positions with the engine and write JSONL.")
+    parser.add_argument("input", help="file with one FEN or EPD per line, or - for stdin")
+    parser.add_argument("--output", default="analysis.jsonl")
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument("--depth", type=int, help="search depth per position (default: engine.py's search_depth)")
+    limit.add_argument("--movetime", type=int, help="milliseconds per position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="engine processes (default: all cores)")
+    parser.add_argument("--window", type=int, help="positions in flight at once (default: 4 per worker)")
+    parser.add_argument("--engine", help="UCI engine binary, or 'builtin' for the built-in engine "
+                                         "(default: the one engine.py uses)")
+    parser.add_argument("--resume", action="store_true", help="carry on from the output's checkpoint")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="positions between checkpoints")
+    args = parser.parse_args()
+
+    import engine
+    engine_path = args.engine or engine.resolve_engine()
+    if engine_path == "builtin" and args.workers != 1:
+        print("The built-in engine searches on one thread, using 1 worker", file=sys.stderr)
+        args.workers = 1
+    depth = args.depth if args.depth or args.movetime else engine.search_depth
+
+    checkpoint = Checkpoint(args.output + ".checkpoint")
+    if args.resume:
+        checkpoint.load()
+        print(f"Resuming after line {checkpoint.lines}", file=sys.stderr)
+
+    # Drop any results written after the last checkpoint, so no position appears twice
+    mode = "r+" if checkpoint.lines and os.path.exists(args.output) else "w"
+    with open(args.output, mode) as output:
+        output.truncate(checkpoint.output_size)
+        output.seek(checkpoint.output_size)
+        if args.input == "-":
+            stream = sys.stdin.buffer
+            positions = read_positions(stream, skip=checkpoint.lines)
+        else:
+            stream = open(args.input, "rb")
+            stream.seek(checkpoint.input_offset)
+            positions = read_positions(stream, checkpoint.lines, checkpoint.input_offset)
+        if engine_path == "builtin":
+            pool = EnginePool(None, 1, factory=lambda: Search(max_time=engine.BUILTIN_MAX_TIME))
+        else:
+            pool = EnginePool(engine_path, args.workers, ANALYSIS_ENGINE_OPTIONS)
+        try:
+            written = analyse(pool, positions, output, checkpoint, depth, args.movetime,
+                              args.window or 4 * args.workers, args.checkpoint_every)
+        except KeyboardInterrupt:
+            print(f"Interrupted; run again with --resume to carry on after line {checkpoint.lines}", file=sys.stderr)
+            raise SystemExit(130)
+        finally:
+            pool.shutdown()
+            if stream is not sys.stdin.buffer:
+                stream.close()
+    print(f"Analysed {written} positions -> {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Micro-benchmark for legal move generation on the start, mid and end presets.
+
+Run with: python benchmark.py [--iterations N] [--search-depth N]
+With --search-depth, also profiles the built-in engine: nodes and time for each depth on each preset.
+"""
+import argparse
+import os
+import time
+
+# Piece sprites need a display surface, so fall back to a dummy one when headless
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+from data.classes.Position import Position, WHITE, BLACK
+from data.classes.Search import Search
+from presets import PRESETS, preset_fen
+
+
+def count_legal_moves(board):
+    """Counts the legal moves of every piece on the board (both colours)."""
+    total = 0
+    for square in board.squares:
+        piece = square.occupying_piece
+        if piece:
+            total += len(piece.get_valid_moves(board))
+    return total
+
+
+def count_legal_moves_cold(board):
+    """count_legal_moves with Board's legal move cache emptied first, so every move is generated."""
+    board.legal_cache_key, board.legal_cache = None, {}
+    return count_legal_moves(board)
+
+
+def count_core_moves(position):
+    """Counts the legal moves of both colours straight from the Position core."""
+    return len(position.legal_moves(WHITE)) + len(position.legal_moves(BLACK))
+
+
+def time_per_call(func, arg, iterations):
+    func(arg)  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(arg)
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_preset(name, iterations):
+    """Times legal move generation for one preset.
+
+    Returns (moves, seconds per generation through Board pieces with an empty legal move cache, the
+    same once the cache holds the position, seconds per generation in the core).
+    """
+    from data.classes.Board import Board
+    board = Board(800, 800, PRESETS[name])
+    moves = count_legal_moves(board)
+    return (moves, time_per_call(count_legal_moves_cold, board, iterations),
+            time_per_call(count_legal_moves, board, iterations),
+            time_per_call(count_core_moves, board.position, iterations))
+
+
+def profile_search(name, depth):
+    """Prints the built-in engine's cost per iterative deepening depth on a preset."""
+    def report(info):
+        print(f"{name:<8}{info['depth']:>6}{info['nodes']:>10}{info['time']:>10}{info['nps']:>10}"
+              f"  {info['score'][0]} {info['score'][1]:<6} {' '.join(info['pv'][:4])}")
+    Search().best_move(Position.from_fen(preset_fen(name)), depth, on_info=report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legal move generation on the board presets.")
+    parser.add_argument("--iterations", type=int, default=50, help="move generations timed per preset")
+    parser.add_argument("--search-depth", type=int, help="also profile the built-in engine up to this depth")
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((800, 800))
+
+    # "board cold" generates every move through the pieces, comparable with runs before the legal
+    # move cache; "board warm" is the same call when the cache already holds the position
+    print(f"{'preset':<8}{'moves':>8}{'board cold ms':>15}{'board warm ms':>15}{'core ms/gen':>14}{'core gen/s':>12}")
+    for name in PRESETS:
+        moves, board_cold, board_warm, core_gen = bench_preset(name, args.iterations)
+        print(f"{name:<8}{moves:>8}{board_cold * 1000:>15.3f}{board_warm * 1000:>15.3f}"
+              f"{core_gen * 1000:>14.3f}{1 / core_gen:>12.1f}")
+    if args.search_depth:
+        print(f"\n{'preset':<8}{'depth':>6}{'nodes':>10}{'ms':>10}{'nps':>10}  score  pv")
+        for name in PRESETS:
+            profile_search(name, args.search_depth)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
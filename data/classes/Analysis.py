@@ -0,0 +1,89 @@
+import threading
+
+
+class Analyser:
+    """Analyses one position at a time on its own engine in a background thread.
+
+    The engine searches until the position changes, and the latest info line of each principal
+    variation is kept for the GUI to draw. analyse() with a new FEN stops the running search and
+    starts the next one on the same warm engine. Works with UciEngine (set MultiPV for several
+    lines) or the built-in Search (one line).
+    """
+    def __init__(self, engine, multipv=3, on_update=None):
+        self.engine = engine
+        self.multipv = multipv
+        engine.set_option("MultiPV", multipv)
+        engine.ready()
+        self.on_update = on_update  # called from the worker when new lines arrive after the last read
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.fen = None  # position wanted, None to stay idle
+        self.searching = None  # position the engine is on
+        self.finished = None  # position whose search ended by itself (e.g. mate on the board)
+        self.lines = {}  # multipv number -> latest info dict
+        self.version = 0  # bumped on every change to lines
+        self.notified = False  # on_update was called and get_lines() hasn't been called since
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='analysis', daemon=True)
+        self.thread.start()
+
+    def analyse(self, fen):
+        """Switches the analysis to fen (None to pause it). Does nothing if it's already on fen."""
+        with self.lock:
+            if fen == self.fen:
+                return
+            self.fen = fen
+            self.lines = {}
+            self.version += 1
+            if self.searching is not None:
+                self.engine.stop()
+            self.changed.notify()
+
+    def get_lines(self):
+        """Returns (info dicts ordered by multipv, version), e.g. to redraw only when version changes."""
+        with self.lock:
+            self.notified = False
+            return [self.lines[number] for number in sorted(self.lines)], self.version
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while self.running and (self.fen is None or self.fen == self.finished):
+                    self.changed.wait()
+                if not self.running:
+                    return
+                fen = self.searching = self.fen
+            try:
+                self.engine.search(fen, on_info=lambda info: self._on_info(fen, info))
+            except Exception as e:
+                print(f"Analysis stopped: {e}")
+                with self.lock:
+                    self.searching = None
+                return
+            with self.lock:
+                self.searching = None
+                if self.fen == fen:  # ended by itself rather than by analyse() moving on
+                    self.finished = fen
+
+    def _on_info(self, fen, info):
+        with self.lock:
+            if fen != self.fen:
+                # The position changed before the engine started, so the earlier stop was missed
+                self.engine.stop()
+                return
+            self.lines[info.get('multipv', 1)] = info
+            self.version += 1
+            notify = not self.notified  # wake the reader once, not for every line
+            self.notified = True
+        if notify and self.on_update:
+            self.on_update()
+
+    def shutdown(self):
+        with self.lock:
+            self.running = False
+            self.fen = None
+            if self.searching is not None:
+                self.engine.stop()
+            self.changed.notify()
+        self.thread.join(timeout=2)
+        self.engine.quit()
@@ -1,5 +1,6 @@
 import pygame
 from data.classes.Square import Square
+from data.classes.Position import Position, WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, COLOUR_NAMES, PIECE_LETTERS, SQUARE_NAMES
 from data.classes.pieces.Rook import Rook
 from data.classes.pieces.Bishop import Bishop
 from data.classes.pieces.Knight import Knight
@@ -7,26 +8,42 @@ from data.classes.pieces.Queen import Queen
 from data.classes.pieces.King import King
 from data.classes.pieces.Pawn import Pawn
 
+PIECE_CLASSES = {PAWN: Pawn, KNIGHT: Knight, BISHOP: Bishop, ROOK: Rook, QUEEN: Queen, KING: King}
+
 class Board:
+    """Renders a Position and turns clicks into moves; all chess rules live in Position."""
     def __init__(self, width, height, config=None):
         self.width = width
         self.height = height
         self.tile_width = width // 8
         self.tile_height = height // 8
         self.selected_piece = None
-        self.turn = 'white'
         self.config = config if config else self.default_config()
         self.squares = self.generate_squares()
+        self.position = Position.from_rows(self.config)
+        self.legal_cache_key = None  # Position hash the cached moves belong to
+        self.legal_cache = {}  # colour -> legal moves of that colour in the cached position
+        self.drawn_states = None  # square_states() as of the last draw, None to redraw everything
+        self.loaded_fen = None  # last string set_fen() loaded, while no move has been played since
+        self.fen_error = (None, None)  # last string set_fen() rejected, and why
+        self.undo_stack = []  # one record per make_move(), see make_move()
         self.setup_board()
-        self.white_king_moved = False
-        self.black_king_moved = False
-        self.white_rook_a_moved = False
-        self.white_rook_h_moved = False
-        self.black_rook_a_moved = False
-        self.black_rook_h_moved = False
-        self.en_passant_square = "-"  # target square after pawn moves two squares
-        self.halfmove_clock = 0  # resets on pawn move or capture
-        self.fullmove_number = 1  # increments after black's move
+
+    def copy(self):
+        """An independent Board in the same position, e.g. to keep as a snapshot.
+
+        Copies only game state; nothing is re-parsed or redrawn. The copy starts with no undo history.
+        """
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.squares = [square.copy() for square in self.squares]
+        board.square_index = {square.pos: square for square in board.squares}
+        board.position = self.position.copy()
+        board.selected_piece = None
+        board.legal_cache = dict(self.legal_cache)
+        board.drawn_states = None
+        board.undo_stack = []
+        return board
 
     def default_config(self):
         return [
@@ -40,23 +57,71 @@ class Board:
             ['wR', 'wN', 'wB', 'wQ', 'wK', 'wB', 'wN', 'wR'],
         ]
 
+    @property
+    def turn(self):
+        return 'white' if self.position.side == WHITE else 'black'
+
+    @property
+    def en_passant_square(self):
+        ep = self.position.ep_square
+        return SQUARE_NAMES[ep] if ep is not None else "-"
+
+    @property
+    def halfmove_clock(self):
+        return self.position.halfmove_clock
+
+    @property
+    def fullmove_number(self):
+        return self.position.fullmove_number
+
     def generate_squares(self):
-        return [Square(x, y, self.tile_width, self.tile_height) for y in range(8) for x in range(8)]
+        squares = [Square(x, y, self.tile_width, self.tile_height) for y in range(8) for x in range(8)]
+        # (x, y) -> Square index, built once so lookups don't scan all 64 squares
+        self.square_index = {square.pos: square for square in squares}
+        return squares
 
     def get_square_from_pos(self, pos):
-        return next(square for square in self.squares if (square.x, square.y) == pos)
+        return self.square_index[pos]
 
     def get_piece_from_pos(self, pos):
-        return self.get_square_from_pos(pos).occupying_piece
+        return self.square_index[pos].occupying_piece
 
     def setup_board(self):
-        piece_classes = {'R': Rook, 'N': Knight, 'B': Bishop, 'Q': Queen, 'K': King, 'P': Pawn}
-        for y, row in enumerate(self.config):
-            for x, piece in enumerate(row):
-                if piece:
-                    square = self.get_square_from_pos((x, y))
-                    piece_class = piece_classes[piece[1]]
-                    square.occupying_piece = piece_class((x, y), 'white' if piece[0] == 'w' else 'black', self)
+        """Puts a Piece on every square the position occupies, keeping Pieces that already match."""
+        for sq, piece in enumerate(self.position.mailbox):
+            square = self.squares[sq]
+            current = square.occupying_piece
+            if not piece:
+                square.occupying_piece = None
+            elif current and type(current) is PIECE_CLASSES[piece[1]] and current.colour == COLOUR_NAMES[piece[0]]:
+                current.has_moved = False
+            else:
+                square.occupying_piece = self.create_piece(square.pos, *piece)
+
+    def set_fen(self, fen):
+        """Loads a FEN string into this board in place.
+
+        Raises ValueError saying what is wrong if the FEN is malformed, leaving the board as it was.
+        Squares and matching Pieces are reused, and loading the same string twice in a row does
+        nothing, so it's cheap enough to call on every keystroke of a FEN preview.
+        """
+        if fen == self.loaded_fen:
+            return
+        if fen == self.fen_error[0]:
+            raise ValueError(self.fen_error[1])
+        try:
+            self.position.set_fen(fen)
+        except ValueError as e:
+            self.fen_error = (fen, str(e))
+            raise
+        self.loaded_fen = fen
+        self.selected_piece = None
+        self.undo_stack = []
+        self.legal_cache_key, self.legal_cache = None, {}
+        self.setup_board()
+
+    def create_piece(self, pos, colour, ptype):
+        return PIECE_CLASSES[ptype](pos, 'white' if colour == WHITE else 'black', self)
 
     def handle_click(self, mx, my):
         x, y = mx // self.tile_width, my // self.tile_height
@@ -64,180 +129,224 @@ class Board:
         if self.selected_piece is None:
             if clicked_square.occupying_piece and clicked_square.occupying_piece.colour == self.turn:
                 self.selected_piece = clicked_square.occupying_piece
-        elif self.selected_piece.move(self, clicked_square):
-            self.turn = 'white' if self.turn == 'black' else 'black'
-        elif clicked_square.occupying_piece and clicked_square.occupying_piece.colour == self.turn:
-            self.selected_piece = clicked_square.occupying_piece
+        elif not self.selected_piece.move(self, clicked_square):
+            if clicked_square.occupying_piece and clicked_square.occupying_piece.colour == self.turn:
+                self.selected_piece = clicked_square.occupying_piece
 
-    def is_in_check(self, colour, board_change=None):
-        king_pos, changing_piece, old_square, new_square, new_square_old_piece = None, None, None, None, None
-        if board_change:
-            old_square, new_square = self.get_square_from_pos(board_change[0]), self.get_square_from_pos(board_change[1])
-            changing_piece, new_square_old_piece = old_square.occupying_piece, new_square.occupying_piece
-            old_square.occupying_piece, new_square.occupying_piece = None, changing_piece
+    def legal_moves(self, colour):
+        """Legal moves of colour, generated once per position and shared by every caller."""
+        key = self.position.hash
+        if key != self.legal_cache_key:
+            self.legal_cache_key = key
+            self.legal_cache = {}
+        moves = self.legal_cache.get(colour)
+        if moves is None:
+            moves = self.legal_cache[colour] = self.position.legal_moves(colour)
+        return moves
+
+    def get_piece_moves(self, piece, legal=True):
+        """Legal (or pseudo-legal) moves of a piece, as packed Position moves."""
+        colour = WHITE if piece.colour == 'white' else BLACK
+        start = piece.y * 8 + piece.x
+        if legal:
+            return [move for move in self.legal_moves(colour) if move & 63 == start]
+        return self.position.pseudo_legal_moves(colour, 1 << start)
+
+    def target_squares(self, moves):
+        """Destination Squares of a list of moves, with promotion choices collapsed."""
+        targets = []
+        for move in moves:
+            square = self.squares[(move >> 6) & 63]
+            if square not in targets:
+                targets.append(square)
+        return targets
+
+    def find_move(self, start_pos, end_pos, promotion=None):
+        """Returns the legal move from start_pos to end_pos, or None.
+
+        promotion is a piece letter such as 'Q'; promotions default to a queen.
+        """
+        start = start_pos[1] * 8 + start_pos[0]
+        end = end_pos[1] * 8 + end_pos[0]
+        piece = self.position.mailbox[start]
+        if piece is None:
+            return None
+        promotion_type = PIECE_LETTERS.index(promotion.upper()) if promotion else QUEEN
+        for move in self.legal_moves(piece[0]):
+            if move & 63 == start and (move >> 6) & 63 == end and (not move >> 12 or move >> 12 == promotion_type):
+                return move
+        return None
 
-        pieces = [square.occupying_piece for square in self.squares if square.occupying_piece]
-        if changing_piece and changing_piece.notation == 'K':
-            king_pos = new_square.pos
-        if not king_pos:
-            king_pos = next(piece.pos for piece in pieces if piece.notation == 'K' and piece.colour == colour)
+    def make_move(self, move, promoted_piece=None):
+        """Plays a Position move and moves the matching Piece objects between squares.
+
+        promoted_piece is the Piece a promoting pawn becomes (a new one is made if not given).
+        The move can be taken back with unmake_move(): the board's undo record keeps the Piece
+        objects involved, and the position's keeps castling rights, en passant square and clocks.
+        """
+        position = self.position
+        start, end = move & 63, (move >> 6) & 63
+        start_square, end_square = self.squares[start], self.squares[end]
+        piece = start_square.occupying_piece
+        colour = position.mailbox[start][0]
+
+        captured_sq = end
+        if position.is_en_passant(move):
+            captured_sq = end + 8 if colour == WHITE else end - 8
+        captured = self.squares[captured_sq].occupying_piece
+        self.squares[captured_sq].occupying_piece = None
+        rook_move = None
+        if position.is_castling(move):
+            rook_start, rook_end = (start + 3, start + 1) if end > start else (start - 4, start - 1)
+            rook = self.squares[rook_start].occupying_piece
+            rook_move = (rook, rook_start, rook_end, rook.has_moved)
+            self.squares[rook_start].occupying_piece = None
+            self.squares[rook_end].occupying_piece = rook
+            rook.pos, rook.x, rook.y = self.squares[rook_end].pos, rook_end & 7, rook_end >> 3
+            rook.has_moved = True
+        # (move, moved Piece, its has_moved before, captured Piece, its square, castling rook details)
+        self.undo_stack.append((move, piece, piece.has_moved, captured, captured_sq, rook_move))
+        position.make_move(move)
+        self.legal_cache_key, self.legal_cache = None, {}
+        self.loaded_fen = None
+
+        start_square.occupying_piece = None
+        piece.pos, piece.x, piece.y = end_square.pos, end_square.x, end_square.y
+        piece.has_moved = True
+        if move >> 12:
+            piece = promoted_piece or self.create_piece(end_square.pos, colour, move >> 12)
+        end_square.occupying_piece = piece
+
+    def unmake_move(self):
+        """Takes back the last make_move(), putting the same Piece objects back. Returns the move."""
+        move, piece, had_moved, captured, captured_sq, rook_move = self.undo_stack.pop()
+        self.position.unmake_move()
+        self.legal_cache_key, self.legal_cache = None, {}
+        self.loaded_fen = None
+        self.selected_piece = None
 
-        in_check = any(king_pos == square.pos for piece in pieces if piece.colour != colour for square in piece.attacking_squares(self))
+        start_square = self.squares[move & 63]
+        self.squares[(move >> 6) & 63].occupying_piece = None  # the piece, or what it promoted to
+        start_square.occupying_piece = piece
+        piece.pos, piece.x, piece.y = start_square.pos, start_square.x, start_square.y
+        piece.has_moved = had_moved
+        if captured:
+            self.squares[captured_sq].occupying_piece = captured
+        if rook_move:
+            rook, rook_start, rook_end, rook_had_moved = rook_move
+            self.squares[rook_end].occupying_piece = None
+            self.squares[rook_start].occupying_piece = rook
+            rook.pos, rook.x, rook.y = self.squares[rook_start].pos, rook_start & 7, rook_start >> 3
+            rook.has_moved = rook_had_moved
+        return move
 
-        if board_change:
-            old_square.occupying_piece, new_square.occupying_piece = changing_piece, new_square_old_piece
-        return in_check
+    def is_in_check(self, colour, board_change=None):
+        """Whether colour's king is attacked, optionally after moving board_change[0] to board_change[1]."""
+        colour = WHITE if colour == 'white' else BLACK
+        if not board_change:
+            return self.position.in_check(colour)
+        start = board_change[0][1] * 8 + board_change[0][0]
+        end = board_change[1][1] * 8 + board_change[1][0]
+        piece = self.position.mailbox[start]
+        if piece is None:
+            return self.position.in_check(colour)
+        for move in self.position.pseudo_legal_moves(piece[0], 1 << start):
+            if (move >> 6) & 63 == end:
+                self.position.make_move(move)
+                in_check = self.position.in_check(colour)
+                self.position.unmake_move()
+                return in_check
+        return self.position.in_check(colour)
 
     def is_in_checkmate(self, colour):
-        king = next(piece for piece in (square.occupying_piece for square in self.squares) if piece and piece.notation == 'K' and piece.colour == colour)
-        return not king.get_valid_moves(self) and self.is_in_check(colour)
+        colour = WHITE if colour == 'white' else BLACK
+        return self.position.in_check(colour) and not self.legal_moves(colour)
+
+    def is_threefold_repetition(self):
+        return self.position.is_repetition(3)
 
     def is_trapped(self, colour):
         """Check if the current player is trapped and can't move any piece."""
-        pieces = [square.occupying_piece for square in self.squares if square.occupying_piece and square.occupying_piece.colour == colour]
-        
-        # Check if any piece has valid moves
-        for piece in pieces:
-            if piece.get_valid_moves(self):
-                return False  # Player has a valid move, they are not trapped
-
-        return True  # No valid moves for the player, they are trapped
+        return not self.legal_moves(WHITE if colour == 'white' else BLACK)
 
-    def draw(self, display):
-        # Draw squares and highlight moves
+    def square_states(self):
+        """What every square should show: ((piece letter, colour) or None, highlighted, red check outline)."""
+        highlighted = set()
         if self.selected_piece:
-            self.get_square_from_pos(self.selected_piece.pos).highlight = True
-            for square in self.selected_piece.get_valid_moves(self):
-                square.highlight = True
-
-        for square in self.squares:
+            highlighted.add(self.selected_piece.y * 8 + self.selected_piece.x)
+            highlighted.update((move >> 6) & 63 for move in self.get_piece_moves(self.selected_piece))
+        # Red outline around king in check (but not checkmate)
+        checked = set()
+        for colour in (WHITE, BLACK):
+            king_sq = self.position.king_square(colour)
+            if king_sq is not None and self.position.in_check(colour) and self.legal_moves(colour):
+                checked.add(king_sq)
+        return [(square.occupying_piece and (square.occupying_piece.notation, square.occupying_piece.colour),
+                 sq in highlighted, sq in checked)
+                for sq, square in enumerate(self.squares)]
+
+    def invalidate(self):
+        """Forgets what was drawn, e.g. after something else painted over the board."""
+        self.drawn_states = None
+
+    def invalidate_rect(self, rect):
+        """Forgets what was drawn on the squares under rect, so the next dirty draw repaints them."""
+        if self.drawn_states is None:
+            return
+        for sq, square in enumerate(self.squares):
+            if square.rect.colliderect(rect):
+                self.drawn_states[sq] = None
+
+    def draw(self, display, dirty_only=False):
+        """Draws the board and returns the Rects of the squares drawn.
+
+        With dirty_only, only squares whose piece, highlight or check outline changed since the
+        last draw are redrawn, so an unchanged board costs nothing to draw.
+        """
+        states = self.square_states()
+        drawn = self.drawn_states if dirty_only else None
+        rects = []
+        for sq, state in enumerate(states):
+            if drawn is not None and drawn[sq] == state:
+                continue
+            square = self.squares[sq]
+            square.highlight = state[1]
             square.draw(display)
-
-        # Draw red outline around king in check (but not checkmate)
-        for square in self.squares:
-            piece = square.occupying_piece
-            if piece and piece.notation == 'K':
-                colour = piece.colour
-                if self.is_in_check(colour) and not self.is_in_checkmate(colour):
-                    pygame.draw.rect(display, (255, 0, 0), square.rect, 4)  # Red outline for check
-
+            if state[2]:
+                pygame.draw.rect(display, (255, 0, 0), square.rect, 4)  # Red outline for check
+            rects.append(square.rect)
+        self.drawn_states = states
+        return rects
 
     def get_fen(self):
         """Generates an updated FEN string based on the current board state."""
-        board_state = [["" for _ in range(8)] for _ in range(8)]
-
-        # Populate board_state from self.squares
-        for square in self.squares:
-            piece = square.occupying_piece
-            if piece:
-                symbol = piece.notation.upper() if piece.colour == "white" else piece.notation.lower()
-                board_state[square.y][square.x] = symbol
-
-        # Convert board_state into FEN format
-        fen_rows = []
-        for row in board_state:
-            empty_count = 0
-            fen_row = ""
-            for cell in row:
-                if cell == "":
-                    empty_count += 1
-                else:
-                    if empty_count > 0:
-                        fen_row += str(empty_count)
-                        empty_count = 0
-                    fen_row += cell
-            if empty_count > 0:
-                fen_row += str(empty_count)
-            fen_rows.append(fen_row)
-
-        piece_placement = "/".join(fen_rows)
-        active_colour = "w" if self.turn == "white" else "b"
-        castling = self.get_castling_rights()
-        ep = self.en_passant_square
-        half = self.halfmove_clock
-        full = self.fullmove_number
-        fen = f"{piece_placement} {active_colour} {castling} {ep} {half} {full}"
-        
-        # Debugging output
-        print(f"Generated FEN: {fen}")
-        return fen
+        return self.position.fen()
 
     def get_castling_rights(self):
-        rights = ''
-
-        # Find pieces manually
-        white_king = self.get_piece_from_pos((4, 7))
-        white_rook_h = self.get_piece_from_pos((7, 7))
-        white_rook_a = self.get_piece_from_pos((0, 7))
-        black_king = self.get_piece_from_pos((4, 0))
-        black_rook_h = self.get_piece_from_pos((7, 0))
-        black_rook_a = self.get_piece_from_pos((0, 0))
-
-        if white_king and white_king.notation == 'K' and not self.white_king_moved:
-            if white_rook_h and white_rook_h.notation == 'R' and not self.white_rook_h_moved:
-                rights += 'K'
-            if white_rook_a and white_rook_a.notation == 'R' and not self.white_rook_a_moved:
-                rights += 'Q'
-        
-        if black_king and black_king.notation == 'K' and not self.black_king_moved:
-            if black_rook_h and black_rook_h.notation == 'R' and not self.black_rook_h_moved:
-                rights += 'k'
-            if black_rook_a and black_rook_a.notation == 'R' and not self.black_rook_a_moved:
-                rights += 'q'
-
-        return rights or '-'
-
-    def move_piece(self, start_pos, end_pos):
-        """Moves a piece on the board and updates FEN."""
-        start_square = self.get_square_from_pos(start_pos)
-        end_square = self.get_square_from_pos(end_pos)
-
-        moving_piece = start_square.occupying_piece
+        return self.position.castling_fen()
+
+    def move_piece(self, start_pos, end_pos, promotion=None):
+        """Moves a piece on the board and updates FEN.
+
+        promotion is the piece letter a pawn promotes to (e.g. from an engine's 'e7e8n'); without
+        it the player is asked, as when clicking.
+        """
+        moving_piece = self.get_piece_from_pos(start_pos)
 
         if not moving_piece:
             return None
 
-        moved = moving_piece.move(self, end_square)
+        if promotion:
+            move = self.find_move(start_pos, end_pos, promotion)
+            if move is None:
+                return None
+            self.make_move(move)
+            moved = True
+        else:
+            moved = moving_piece.move(self, self.get_square_from_pos(end_pos))
         if moved:
-            # Update castling flags
-            if moving_piece.notation == 'K':  # King moves
-                if moving_piece.colour == 'white':
-                    self.white_king_moved = True
-                else:
-                    self.black_king_moved = True
-            elif moving_piece.notation == 'R':  # Rook moves
-                if moving_piece.colour == 'white':
-                    if start_pos == (0, 7):  # a1
-                        self.white_rook_a_moved = True
-                    elif start_pos == (7, 7):  # h1
-                        self.white_rook_h_moved = True
-                elif moving_piece.colour == 'black':
-                    if start_pos == (0, 0):  # a8
-                        self.black_rook_a_moved = True
-                    elif start_pos == (7, 0):  # h8
-                        self.black_rook_h_moved = True
-
-            # Reset halfmove clock on pawn move or capture
-            if moving_piece.notation == 'P' or end_square.occupying_piece:
-                self.halfmove_clock = 0
-            else:
-                self.halfmove_clock += 1
-
-            # Set en passant target square
-            if moving_piece.notation == 'P' and abs(start_pos[1] - end_pos[1]) == 2:
-                ep_file = chr(ord('a') + start_pos[0])
-                ep_rank = str((start_pos[1] + end_pos[1]) // 2)
-                self.en_passant_square = f"{ep_file}{ep_rank}"
-            else:
-                self.en_passant_square = "-"
-                
-            # Increment fullmove number after black's move
-            if self.turn == 'black':
-                self.fullmove_number += 1
-
             # Update FEN after move
             new_fen = self.get_fen()
             print(f"Updated FEN: {new_fen}")  # Debugging output
             return new_fen
         return None
-
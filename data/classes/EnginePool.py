@@ -0,0 +1,132 @@
+import queue
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+from data.classes.UciEngine import UciEngine
+
+
+class EnginePool:
+    """Keeps warm UCI engine processes and runs best-move searches on them in the background.
+
+    submit() returns a concurrent.futures.Future holding the UCI best move. Cancelled requests
+    raise CancelledError from result(), including ones that were stopped mid-search.
+    With factory, the engines are whatever it returns (e.g. the built-in Search) instead of UCI processes.
+    """
+    def __init__(self, path, size=2, options=None, factory=None):
+        self.path = path
+        self.options = dict(options or {})
+        self.factory = factory
+        self.engines = [self._start() for _ in range(size)]
+        self.idle = queue.Queue()
+        for engine in self.engines:
+            self.idle.put(engine)
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='uci-engine')
+        self.lock = threading.Lock()
+        self.pending = set()  # futures not finished yet
+        self.running = {}  # future -> engine searching for it
+        self.stopped = set()  # running futures whose search was cancelled
+
+    def submit(self, fen, depth=None, movetime=None, on_info=None):
+        """Queues a search and returns a Future of (best move, last info dict)."""
+        future = Future()
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._forget)
+        self.executor.submit(self._run, future, fen, depth, movetime, on_info)
+        return future
+
+    def _start(self):
+        return self.factory() if self.factory else UciEngine(self.path, self.options)
+
+    def _restart(self, engine):
+        """Replaces an engine whose search failed (e.g. its process died) with a fresh one.
+
+        Returns the old engine if a new one can't be started, so the pool keeps its size.
+        """
+        engine.quit()
+        try:
+            fresh = self._start()
+        except (OSError, RuntimeError) as e:
+            print(f"Couldn't restart the engine: {e}")
+            return engine
+        with self.lock:
+            self.engines[self.engines.index(engine)] = fresh
+        return fresh
+
+    def _forget(self, future):
+        with self.lock:
+            self.pending.discard(future)
+            self.stopped.discard(future)
+
+    def _run(self, future, fen, depth, movetime, on_info):
+        if not future.set_running_or_notify_cancel():
+            return
+        engine = self.idle.get()
+        with self.lock:
+            stopped = future in self.stopped  # cancelled while it waited for an engine
+            if not stopped:
+                self.running[future] = engine
+        if stopped:
+            self.idle.put(engine)
+            future.set_exception(CancelledError())
+            return
+        try:
+            result = engine.search(fen, depth, movetime, lambda info: self._report(future, engine, info, on_info))
+        except Exception as e:
+            with self.lock:
+                del self.running[future]
+            self.idle.put(self._restart(engine))
+            future.set_exception(e)
+            return
+        with self.lock:
+            del self.running[future]
+            stopped = future in self.stopped
+        self.idle.put(engine)
+        if stopped:
+            future.set_exception(CancelledError())
+        else:
+            future.set_result(result)
+
+    def _report(self, future, engine, info, on_info):
+        # A stop sent just before the engine started searching is ignored, so repeat it
+        if future in self.stopped:
+            engine.stop()
+        elif on_info:
+            on_info(info)
+
+    def cancel(self, future):
+        """Drops a queued request, or stops its search if an engine is already on it."""
+        if future.cancel():
+            return
+        with self.lock:
+            if future not in self.pending:
+                return  # already finished
+            self.stopped.add(future)
+            engine = self.running.get(future)
+            if engine is not None:
+                engine.stop()
+
+    def cancel_all(self):
+        with self.lock:
+            futures = list(self.pending)
+        for future in futures:
+            self.cancel(future)
+
+    def configure(self, options):
+        """Sets UCI options on every engine, waiting for running searches to finish first."""
+        self.options.update(options)
+        engines = [self.idle.get() for _ in self.engines]
+        try:
+            for engine in engines:
+                for name, value in options.items():
+                    engine.set_option(name, value)
+                engine.ready()
+        finally:
+            for engine in engines:
+                self.idle.put(engine)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=True)
+        for engine in self.engines:
+            engine.quit()
@@ -0,0 +1,63 @@
+import time
+from collections import deque
+
+import pygame
+
+WAKE_EVENT = pygame.event.custom_type()  # posted by wake() to end an idle wait
+
+
+class FrameClock:
+    """Paces every screen's loop.
+
+    Each loop draws its frame and then calls events(). That caps the frame rate at fps, and when
+    nothing is queued (and the caller isn't busy animating or waiting on a search) it sleeps in
+    pygame.event.wait() instead of spinning, so a static menu uses no CPU.
+    """
+    def __init__(self, fps=60, on_stats=None, stats_interval=1.0):
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self.on_stats = on_stats  # called with stats() every stats_interval seconds
+        self.stats_interval = stats_interval
+        self.frame_times = deque(maxlen=240)  # (frame end time, ms spent building the frame)
+        self.frames = 0
+        self.idle_time = 0.0
+        self.frame_start = time.perf_counter()
+        self.last_report = self.frame_start
+
+    def events(self, busy=False):
+        """Ends the current frame and returns the events for the next one.
+
+        With busy, never blocks (e.g. while the AI's search is running and we need to poll it).
+        """
+        now = time.perf_counter()
+        self.frames += 1
+        self.frame_times.append((now, (now - self.frame_start) * 1000))
+        if self.on_stats and now - self.last_report >= self.stats_interval:
+            self.last_report = now
+            self.on_stats(self.stats())
+
+        self.clock.tick(self.fps)  # sleeps off the rest of the frame budget
+        events = pygame.event.get()
+        if not events and not busy:
+            idle_start = time.perf_counter()
+            events = [pygame.event.wait()]
+            events += pygame.event.get()
+            self.idle_time += time.perf_counter() - idle_start
+        self.frame_start = time.perf_counter()
+        return [event for event in events if event.type != WAKE_EVENT]
+
+    def wake(self):
+        """Ends an idle wait early. Safe to call from other threads, e.g. an engine callback."""
+        pygame.event.post(pygame.event.Event(WAKE_EVENT))
+
+    def stats(self):
+        """Frame-time stats over the last second of frames."""
+        now = time.perf_counter()
+        recent = [ms for end, ms in self.frame_times if now - end <= 1.0]
+        return {
+            "fps": len(recent),
+            "frame_ms": sum(recent) / len(recent) if recent else 0.0,
+            "max_frame_ms": max(recent, default=0.0),
+            "frames": self.frames,
+            "idle_s": self.idle_time,
+        }
@@ -0,0 +1,78 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def normalize_fen(fen):
+    """Drops the halfmove and fullmove counters, which don't change the engine's answer."""
+    return ' '.join(fen.split()[:4])
+
+
+class MoveCache:
+    """LRU cache of engine results keyed by position and search settings.
+
+    With a path, results are also written to a SQLite file so they survive restarts.
+    """
+    def __init__(self, max_size=10000, path=None):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key -> (best move, info)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # results are stored from engine worker threads
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS moves (key TEXT PRIMARY KEY, move TEXT, info TEXT)")
+            self.db.commit()
+
+    @staticmethod
+    def make_key(fen, depth, options=None):
+        settings = ','.join(f"{name}={value}" for name, value in sorted((options or {}).items()))
+        return f"{normalize_fen(fen)}|{depth}|{settings}"
+
+    def get(self, key):
+        """Returns (best move, info) for a key, or None on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                row = self.db.execute("SELECT move, info FROM moves WHERE key = ?", (key,)).fetchone()
+                if row:
+                    info = json.loads(row[1])
+                    if 'score' in info:
+                        info['score'] = tuple(info['score'])
+                    entry = (row[0], info)
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, best_move, info=None):
+        entry = (best_move, info or {})
+        with self.lock:
+            self._remember(key, entry)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO moves VALUES (?, ?, ?)", (key, best_move, json.dumps(entry[1])))
+                self.db.commit()
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,130 @@
+"""Move notation: UCI ('e7e8q'), SAN ('exd8=Q+') and the Board's ((x, y), (x, y)) square pairs.
+
+Every conversion is a lookup in tables built once at import, so annotating every move of a game
+or an engine log costs little. SAN needs the position the move is played in, for captures,
+disambiguation and check marks.
+"""
+from data.classes.Position import PAWN, PIECE_LETTERS, SQUARE_NAMES, SQUARE_BY_NAME, move_to_uci, uci_to_move
+
+# (x, y) Board coordinates of each square index and back
+SQUARE_XY = [(sq & 7, sq >> 3) for sq in range(64)]
+SQUARE_OF_XY = {xy: sq for sq, xy in enumerate(SQUARE_XY)}
+# (from (x, y), to (x, y)) of every from | to << 6 pair
+XY_OF_FROM_TO = [(SQUARE_XY[pair & 63], SQUARE_XY[pair >> 6]) for pair in range(4096)]
+# SAN piece letter by piece type (none for pawns) and the letter after '=' by promotion type
+SAN_LETTERS = ('',) + tuple(PIECE_LETTERS[1:])
+PROMOTION_OF_LETTER = {letter: PIECE_LETTERS.index(letter) for letter in 'NBRQ'}
+
+
+def square_name(x, y):
+    """'e4' for Board coordinates (4, 4)."""
+    return SQUARE_NAMES[y * 8 + x]
+
+
+def move_to_xy(move):
+    """(from (x, y), to (x, y), promotion piece letter or None) of a packed move."""
+    start, end = XY_OF_FROM_TO[move & 4095]
+    return start, end, PIECE_LETTERS[move >> 12] if move >> 12 else None
+
+
+def xy_to_move(start_pos, end_pos, promotion=None):
+    """Packs Board coordinates (and a promotion letter such as 'Q') into a move, without checking it's legal."""
+    move = SQUARE_OF_XY[start_pos] | SQUARE_OF_XY[end_pos] << 6
+    return move | PROMOTION_OF_LETTER[promotion.upper()] << 12 if promotion else move
+
+
+def uci_to_xy(uci):
+    """(from (x, y), to (x, y), promotion letter or None) of a UCI move such as 'a7a8q'.
+
+    Raises ValueError if it isn't a well-formed UCI move.
+    """
+    move = uci_to_move(uci)
+    if move is None:
+        raise ValueError(f"Not a UCI move: {uci!r}")
+    return move_to_xy(move)
+
+
+def xy_to_uci(start_pos, end_pos, promotion=None):
+    """The UCI text of a move between Board coordinates, e.g. 'e7e8q'."""
+    return move_to_uci(xy_to_move(start_pos, end_pos, promotion))
+
+
+def move_to_san(position, move):
+    """Formats a legal move of the position in SAN, e.g. 'Nbd7', 'exd6', 'e8=Q+' or 'O-O#'."""
+    from_sq, to_sq, promotion = move & 63, (move >> 6) & 63, move >> 12
+    ptype = position.mailbox[from_sq][1]
+    if position.is_castling(move):
+        san = 'O-O' if to_sq > from_sq else 'O-O-O'
+    else:
+        capture = position.mailbox[to_sq] is not None or position.is_en_passant(move)
+        if ptype == PAWN:
+            san = SQUARE_NAMES[from_sq][0] + 'x' if capture else ''
+        else:
+            san = SAN_LETTERS[ptype]
+            # Other pieces of the same kind that could also go to to_sq
+            rivals = [other & 63 for other in position.legal_moves(from_mask=position.pieces[position.side][ptype])
+                      if (other >> 6) & 63 == to_sq and other & 63 != from_sq]
+            if rivals:
+                if all(sq & 7 != from_sq & 7 for sq in rivals):
+                    san += SQUARE_NAMES[from_sq][0]
+                elif all(sq >> 3 != from_sq >> 3 for sq in rivals):
+                    san += SQUARE_NAMES[from_sq][1]
+                else:
+                    san += SQUARE_NAMES[from_sq]
+            if capture:
+                san += 'x'
+        san += SQUARE_NAMES[to_sq]
+        if promotion:
+            san += '=' + PIECE_LETTERS[promotion]
+    position.make_move(move)
+    if position.in_check():
+        san += '+' if position.has_legal_moves() else '#'
+    position.unmake_move()
+    return san
+
+
+def san_to_move(position, san):
+    """Returns the legal move of the position a SAN string describes, or None if there isn't exactly one."""
+    san = san.rstrip('+#!?')
+    if san in ('O-O', 'O-O-O', '0-0', '0-0-0'):
+        king_sq = position.king_squares[position.side]
+        if king_sq is None:
+            return None
+        to_sq = king_sq + (2 if len(san) == 3 else -2)
+        return next((move for move in position.legal_moves(from_mask=1 << king_sq)
+                     if (move >> 6) & 63 == to_sq and position.is_castling(move)), None)
+    promotion = 0
+    if '=' in san:
+        san, _, letter = san.partition('=')
+        promotion = PROMOTION_OF_LETTER.get(letter)
+        if promotion is None:
+            return None
+    elif len(san) > 2 and san[-1] in PROMOTION_OF_LETTER and san[0] in 'abcdefgh':
+        san, promotion = san[:-1], PROMOTION_OF_LETTER[san[-1]]  # 'e8Q' without the '='
+    ptype = PAWN
+    if san and san[0] in 'NBRQK':
+        ptype, san = PIECE_LETTERS.index(san[0]), san[1:]
+    to_sq = SQUARE_BY_NAME.get(san[-2:])
+    if to_sq is None:
+        return None
+    hint = san[:-2].replace('x', '')  # the from file, rank or square that picks between pieces
+    found = None
+    for move in position.legal_moves(from_mask=position.pieces[position.side][ptype]):
+        from_name = SQUARE_NAMES[move & 63]
+        if ((move >> 6) & 63 == to_sq and move >> 12 == promotion
+                and all(char in from_name for char in hint)):
+            if found is not None:
+                return None  # ambiguous
+            found = move
+    return found
+
+
+def uci_to_san(position, uci):
+    """SAN of a UCI move in the position, e.g. for engine logs; None if the move isn't legal there."""
+    move = position.parse_uci(uci)
+    return move_to_san(position, move) if move is not None else None
+
+
+def san_to_uci(position, san):
+    move = san_to_move(position, san)
+    return move_to_uci(move) if move is not None else None
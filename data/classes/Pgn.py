@@ -0,0 +1,145 @@
+import re
+
+from data.classes.Notation import move_to_san, san_to_move
+from data.classes.Position import Position, START_FEN, WHITE
+
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+SEVEN_TAG_ROSTER = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# Comments, variation brackets, NAGs and everything else (moves, move numbers, results)
+TOKEN = re.compile(r'\{[^}]*\}?|;[^\n]*|[()]|\$\d+|[^\s(){};$]+')
+MOVE_NUMBER = re.compile(r'^\d+\.*')
+
+
+class PgnGame:
+    """One game from a PGN file: its tag pairs, its main line in SAN and the comment after each move."""
+    def __init__(self, headers, moves, comments=None):
+        self.headers = headers
+        self.moves = moves
+        self.comments = comments if comments is not None else [None] * len(moves)
+
+    @property
+    def result(self):
+        return self.headers.get('Result', '*')
+
+    @property
+    def start_fen(self):
+        return self.headers.get('FEN', START_FEN)
+
+    def replay(self, position=None):
+        """Plays the game out, yielding (position, move) before each move is made.
+
+        The same Position is updated in place (copy() it to keep one). Pass a position to reuse it
+        between games instead of making a new one. Raises ValueError at a move that isn't legal.
+        """
+        if position is None:
+            position = Position.from_fen(self.start_fen)
+        else:
+            position.set_fen(self.start_fen)
+        for ply, san in enumerate(self.moves):
+            move = san_to_move(position, san)
+            if move is None:
+                raise ValueError(f"illegal or ambiguous move {san!r} at ply {ply + 1}")
+            yield position, move
+            position.make_move(move)
+
+
+def format_game(headers, start_fen, moves, comments=None, result='*'):
+    """A game as PGN text: tag pairs, then the moves in SAN wrapped at 80 columns.
+
+    moves are packed Position moves from start_fen; comments, if given, has an entry (or None)
+    per move that is written after it, e.g. '[%emt 0:00:03]'.
+    """
+    headers = dict(headers, Result=result)
+    if start_fen != START_FEN:
+        headers.update(SetUp='1', FEN=start_fen)
+    ordered = [tag for tag in SEVEN_TAG_ROSTER if tag in headers] + [tag for tag in headers if tag not in SEVEN_TAG_ROSTER]
+    lines = [f'[{tag} "{escape(str(headers[tag]))}"]' for tag in ordered]
+    lines.append('')
+
+    position = Position.from_fen(start_fen)
+    tokens = []
+    for ply, move in enumerate(moves):
+        if position.side == WHITE or ply == 0:
+            tokens.append(f"{position.fullmove_number}{'.' if position.side == WHITE else '...'}")
+        tokens.append(move_to_san(position, move))
+        if comments and comments[ply]:
+            tokens.append('{' + comments[ply].replace('}', ')') + '}')
+        position.make_move(move)
+    tokens.append(result)
+
+    line = ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 80:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return '\n'.join(lines) + '\n\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def parse_movetext(text):
+    """(SAN moves of the main line, comment after each move, result token) from a game's movetext."""
+    moves, comments, result = [], [], '*'
+    depth = 0  # inside this many variations
+    for token in TOKEN.findall(text):
+        first = token[0]
+        if first == '(':
+            depth += 1
+        elif first == ')':
+            depth = max(depth - 1, 0)
+        elif depth or first == '$':
+            continue
+        elif first in '{;':
+            if moves:
+                comment = token[1:].rstrip('}').strip()
+                comments[-1] = f"{comments[-1]} {comment}" if comments[-1] else comment
+        elif token in RESULTS:
+            result = token
+        else:
+            token = MOVE_NUMBER.sub('', token)
+            if token:
+                moves.append(token)
+                comments.append(None)
+    return moves, comments, result
+
+
+def read_games(stream):
+    """Yields a PgnGame for each game in a text stream, reading one game at a time.
+
+    Only the game being read is held in memory, so files of any size can be streamed.
+    """
+    headers, movetext = {}, []
+    in_comment = False  # inside a {comment} that spans lines
+    for line in stream:
+        if line.startswith('%'):
+            continue  # escaped line
+        stripped = line.strip()
+        if not in_comment and stripped.startswith('['):
+            if movetext:  # tags after moves start the next game
+                yield make_game(headers, movetext)
+                headers, movetext = {}, []
+            match = TAG.match(stripped)
+            if match:
+                headers[match.group(1)] = re.sub(r'\\(.)', r'\1', match.group(2))
+            continue
+        if stripped:
+            movetext.append(stripped)
+            # Braces can't nest, so the last one on the line says whether a comment is still open
+            last_open, last_close = stripped.rfind('{'), stripped.rfind('}')
+            if last_open != last_close:
+                in_comment = last_open > last_close
+    if headers or movetext:
+        yield make_game(headers, movetext)
+
+
+def make_game(headers, movetext):
+    moves, comments, result = parse_movetext('\n'.join(movetext))
+    if 'Result' not in headers:
+        headers['Result'] = result
+    return PgnGame(headers, moves, comments)
@@ -1,57 +1,47 @@
 import pygame
 
 class Piece:
-    def __init__(self, pos, colour, board, is_ai=False):
+    """Game state of a piece. Slotted and free of pygame objects so Boards stay small and cheap to copy;
+    the sprite is looked up when the piece is drawn (see Sprites.piece_sprite)."""
+    __slots__ = ('pos', 'x', 'y', 'colour', 'is_ai', 'has_moved')
+    notation = None  # 'K', 'Q', ... set by each piece class
+    sprite_name = None  # image name in data/images, e.g. 'king'
+    sprite_margin = 20  # pixels the sprite is smaller than its square
+
+    def __init__(self, pos, colour, board=None, is_ai=False):
         self.pos = pos
         self.x, self.y = pos
         self.colour = colour
-        self.board = board
         self.is_ai = is_ai  # Flag to check if it's AI's piece
         self.has_moved = False
 
+    def copy(self):
+        piece = self.__class__.__new__(self.__class__)
+        piece.pos, piece.x, piece.y, piece.colour = self.pos, self.x, self.y, self.colour
+        piece.is_ai, piece.has_moved = self.is_ai, self.has_moved
+        return piece
+
     def get_moves(self, board):
-        output = []
-        for direction in self.get_possible_moves(board):
-            for square in direction:
-                if square.occupying_piece:
-                    if square.occupying_piece.colour == self.colour:
-                        break
-                    output.append(square)
-                    break
-                output.append(square)
-        return output
+        return board.target_squares(board.get_piece_moves(self, legal=False))
 
     def get_valid_moves(self, board):
-        return [square for square in self.get_moves(board) if not board.is_in_check(self.colour, board_change=[self.pos, square.pos])]
+        return board.target_squares(board.get_piece_moves(self))
 
-    def move(self, board, square, force=False):
-        for sq in board.squares:
-            sq.highlight = False
-        if square in self.get_valid_moves(board) or force:
-            prev_square = board.get_square_from_pos(self.pos)
-            self.pos, self.x, self.y = square.pos, square.x, square.y
-            prev_square.occupying_piece = None
-            square.occupying_piece = self
-            board.selected_piece = None
-            self.has_moved = True
-            self.handle_special_moves(board, prev_square, square)
-            return True
+    def move(self, board, square):
         board.selected_piece = None
-        return False
-
-    def handle_special_moves(self, board, prev_square, square):
-        # Pawn Promotion
-        if self.notation == 'P' and (self.y == 0 or self.y == 7):  # Pawn reaches last rank
-            promotion_piece = self.choose_promotion(board)  # Automatically promote if AI
-            square.occupying_piece = promotion_piece  # Replace pawn with chosen piece
-        # Castling
-        if self.notation == 'K':
-            if prev_square.x - self.x == 2:  # Queenside castling
-                rook = board.get_piece_from_pos((0, self.y))
-                rook.move(board, board.get_square_from_pos((3, self.y)), force=True)
-            elif prev_square.x - self.x == -2:  # Kingside castling
-                rook = board.get_piece_from_pos((7, self.y))
-                rook.move(board, board.get_square_from_pos((5, self.y)), force=True)
+        moves = [move for move in board.get_piece_moves(self) if (move >> 6) & 63 == square.y * 8 + square.x]
+        if not moves:
+            return False
+        move, promoted_piece = moves[0], None
+        if move >> 12:  # Pawn reaches last rank
+            prev_pos = self.pos
+            self.pos, self.x, self.y = square.pos, square.x, square.y
+            promoted_piece = self.choose_promotion(board)
+            board.invalidate()  # the promotion popup painted over the board
+            self.pos, self.x, self.y = prev_pos, prev_pos[0], prev_pos[1]
+            move = board.find_move(self.pos, square.pos, promoted_piece.notation)
+        board.make_move(move, promoted_piece)
+        return True
 
     def choose_promotion(self, board):
         """ AI decides on the promotion piece. """
@@ -136,4 +126,5 @@ class Piece:
         return selected_piece
 
     def attacking_squares(self, board):
-        return self.get_moves(board)
+        attacks = board.position.attacks_from(self.y * 8 + self.x)
+        return [square for square in board.squares if attacks >> (square.y * 8 + square.x) & 1]
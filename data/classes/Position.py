@@ -0,0 +1,749 @@
+"""Headless chess position stored as 64-bit integer bitboards, with move generation.
+
+Squares are indexed y * 8 + x using the same (x, y) layout as Board, so a8 is 0 and h1 is 63.
+Moves are packed into ints: from_sq | to_sq << 6 | promotion << 12.
+Nothing in here needs pygame, so analysis and batch jobs can use it directly.
+"""
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+COLOUR_NAMES = ('white', 'black')
+PIECE_LETTERS = 'PNBRQK'
+SQUARE_NAMES = [file + str(8 - y) for y in range(8) for file in 'abcdefgh']
+SQUARE_BY_NAME = {name: sq for sq, name in enumerate(SQUARE_NAMES)}
+BB_ALL = (1 << 64) - 1
+
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_LETTERS = ((WHITE_KINGSIDE, 'K'), (WHITE_QUEENSIDE, 'Q'), (BLACK_KINGSIDE, 'k'), (BLACK_QUEENSIDE, 'q'))
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+# FEN letter -> (colour, piece type); one shared tuple per piece so parsing doesn't allocate
+FEN_PIECES = {letter: (WHITE, ptype) for ptype, letter in enumerate(PIECE_LETTERS)}
+FEN_PIECES.update({letter.lower(): (BLACK, ptype) for ptype, letter in enumerate(PIECE_LETTERS)})
+CASTLING_RIGHT_OF_LETTER = {letter: right for right, letter in CASTLING_LETTERS}
+
+
+def _leaper_table(deltas):
+    """Builds a per-square attack bitboard for a piece that jumps by fixed (dx, dy) offsets."""
+    table = []
+    for sq in range(64):
+        x, y = sq & 7, sq >> 3
+        attacks = 0
+        for dx, dy in deltas:
+            if 0 <= x + dx < 8 and 0 <= y + dy < 8:
+                attacks |= 1 << ((y + dy) * 8 + x + dx)
+        table.append(attacks)
+    return table
+
+
+def _ray_table(dx, dy):
+    """Builds a per-square bitboard of every square in one direction up to the board edge."""
+    table = []
+    for sq in range(64):
+        x, y = (sq & 7) + dx, (sq >> 3) + dy
+        ray = 0
+        while 0 <= x < 8 and 0 <= y < 8:
+            ray |= 1 << (y * 8 + x)
+            x, y = x + dx, y + dy
+        table.append(ray)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_table(((1, -2), (2, -1), (2, 1), (1, 2), (-1, 2), (-2, 1), (-2, -1), (-1, -2)))
+KING_ATTACKS = _leaper_table(((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)))
+# White pawns move towards y = 0, black pawns towards y = 7
+PAWN_ATTACKS = (_leaper_table(((-1, -1), (1, -1))), _leaper_table(((-1, 1), (1, 1))))
+
+# (ray table, whether the ray runs towards higher square indices)
+ROOK_DIRECTIONS = tuple((_ray_table(dx, dy), dy > 0 or (dy == 0 and dx > 0))
+                        for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0)))
+BISHOP_DIRECTIONS = tuple((_ray_table(dx, dy), dy > 0)
+                          for dx, dy in ((1, -1), (1, 1), (-1, 1), (-1, -1)))
+
+
+def _slider_attacks(sq, occupied, directions):
+    """Attacks along each ray, cut off after the first blocker."""
+    attacks = 0
+    for rays, positive in directions:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= rays[blocker]
+        attacks |= ray
+    return attacks
+
+
+def bishop_attacks(sq, occupied):
+    return _slider_attacks(sq, occupied, BISHOP_DIRECTIONS)
+
+
+def rook_attacks(sq, occupied):
+    return _slider_attacks(sq, occupied, ROOK_DIRECTIONS)
+
+
+def _between_table():
+    """BETWEEN[a][b]: squares strictly between a and b when they share a line, else 0."""
+    between = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        for dx, dy in ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)):
+            x, y = (sq & 7) + dx, (sq >> 3) + dy
+            path = 0
+            while 0 <= x < 8 and 0 <= y < 8:
+                between[sq][y * 8 + x] = path
+                path |= 1 << (y * 8 + x)
+                x, y = x + dx, y + dy
+    return between
+
+
+BETWEEN = _between_table()
+# Slider rays on an empty board, used to find pieces that could pin against the king
+ROOK_RAYS = [rook_attacks(sq, 0) for sq in range(64)]
+BISHOP_RAYS = [bishop_attacks(sq, 0) for sq in range(64)]
+
+
+# Castling rights kept when a move starts or ends on each square
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[60] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)  # e1
+CASTLING_MASK[63] = 15 & ~WHITE_KINGSIDE  # h1
+CASTLING_MASK[56] = 15 & ~WHITE_QUEENSIDE  # a1
+CASTLING_MASK[4] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)  # e8
+CASTLING_MASK[7] = 15 & ~BLACK_KINGSIDE  # h8
+CASTLING_MASK[0] = 15 & ~BLACK_QUEENSIDE  # a8
+
+# right: (king from, king to, rook from, squares that must be empty, squares the king stands on or crosses)
+CASTLING_MOVES = {
+    WHITE_KINGSIDE: (60, 62, 63, (1 << 61) | (1 << 62), (1 << 60) | (1 << 61) | (1 << 62)),
+    WHITE_QUEENSIDE: (60, 58, 56, (1 << 57) | (1 << 58) | (1 << 59), (1 << 60) | (1 << 59) | (1 << 58)),
+    BLACK_KINGSIDE: (4, 6, 7, (1 << 5) | (1 << 6), (1 << 4) | (1 << 5) | (1 << 6)),
+    BLACK_QUEENSIDE: (4, 2, 0, (1 << 1) | (1 << 2) | (1 << 3), (1 << 4) | (1 << 3) | (1 << 2)),
+}
+CASTLING_RIGHTS_OF = ((WHITE_KINGSIDE, WHITE_QUEENSIDE), (BLACK_KINGSIDE, BLACK_QUEENSIDE))
+
+PROMOTION_PIECES = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+
+def _zobrist_keys(seed=2025):
+    import random
+    rng = random.Random(seed)  # fixed seed so hashes are stable between runs
+    pieces = [[[rng.getrandbits(64) for _ in range(64)] for _ in range(6)] for _ in range(2)]
+    castling = [0] + [rng.getrandbits(64) for _ in range(15)]
+    ep_files = [rng.getrandbits(64) for _ in range(8)]
+    return pieces, rng.getrandbits(64), castling, ep_files
+
+
+# Zobrist keys: [colour][piece type][square], black to move, castling rights value, en passant file
+ZOBRIST_PIECES, ZOBRIST_BLACK, ZOBRIST_CASTLING, ZOBRIST_EP = _zobrist_keys()
+
+
+def encode_move(from_sq, to_sq, promotion=0):
+    return from_sq | to_sq << 6 | promotion << 12
+
+
+# UCI text of every from | to << 6 pair, and the promotion suffix by piece type
+UCI_OF_FROM_TO = [SQUARE_NAMES[pair & 63] + SQUARE_NAMES[pair >> 6] for pair in range(4096)]
+FROM_TO_OF_UCI = {uci: pair for pair, uci in enumerate(UCI_OF_FROM_TO)}
+PROMOTION_SUFFIXES = ('', 'n', 'b', 'r', 'q', '')
+PROMOTION_OF_SUFFIX = {suffix: ptype for ptype, suffix in enumerate(PROMOTION_SUFFIXES) if suffix}
+
+
+def move_to_uci(move):
+    """Formats a packed move as a UCI string, e.g. 'e2e4' or 'a7a8q'."""
+    return UCI_OF_FROM_TO[move & 4095] + PROMOTION_SUFFIXES[move >> 12]
+
+
+def uci_to_move(uci):
+    """Packs a UCI string into a move without checking it's legal; None if it isn't well formed."""
+    pair = FROM_TO_OF_UCI.get(uci[:4])
+    if pair is None or len(uci) > 5:
+        return None
+    if len(uci) == 5:
+        promotion = PROMOTION_OF_SUFFIX.get(uci[4])
+        return pair | promotion << 12 if promotion else None
+    return pair
+
+
+def parse_placement(placement):
+    """Parses the first FEN field into a 64-square list of (colour, piece type) or None.
+
+    Raises ValueError saying which rank is wrong.
+    """
+    rows = placement.split('/')
+    if len(rows) != 8:
+        raise ValueError(f"FEN placement needs 8 ranks separated by '/', got {len(rows)}")
+    mailbox = [None] * 64
+    for y, row in enumerate(rows):
+        x = 0
+        for char in row:
+            if char in '12345678':
+                x += ord(char) - 48
+                continue
+            piece = FEN_PIECES.get(char)
+            if piece is None:
+                raise ValueError(f"Unknown piece '{char}' on rank {8 - y}")
+            if x >= 8:
+                raise ValueError(f"Rank {8 - y} ('{row}') covers more than 8 files")
+            if piece[1] == PAWN and (y == 0 or y == 7):
+                raise ValueError(f"Pawn on rank {8 - y}")
+            mailbox[y * 8 + x] = piece
+            x += 1
+        if x != 8:
+            raise ValueError(f"Rank {8 - y} ('{row}') covers {x} files instead of 8")
+    for colour in (WHITE, BLACK):
+        kings = mailbox.count((colour, KING))
+        if kings != 1:
+            raise ValueError(f"{COLOUR_NAMES[colour].capitalize()} needs exactly one king, found {kings}")
+    return mailbox
+
+
+class Position:
+    def __init__(self):
+        self.pieces = [[0] * 6, [0] * 6]  # bitboards per colour and piece type
+        self.occupied = [0, 0]
+        self.mailbox = [None] * 64  # (colour, piece type) or None per square
+        self.side = WHITE
+        self.castling = 0
+        self.ep_square = None  # square a pawn can capture onto en passant
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.undo_stack = []
+        self.hash = 0  # Zobrist hash, updated incrementally as pieces move
+        self.repetitions = {}  # hash -> times the position has occurred in this game
+        self.king_squares = [None, None]
+        self.square_attacks = [0] * 64  # squares attacked by the piece on each square
+        self._attack_maps = [None, None]  # per-colour union of square_attacks, built on demand
+        self._slider_maps = [None, None]
+
+    @classmethod
+    def from_fen(cls, fen=START_FEN):
+        position = cls()
+        position.set_fen(fen)
+        return position
+
+    @classmethod
+    def from_rows(cls, rows, side=WHITE):
+        """Builds a position from Board's 8x8 config of 'wP'-style strings.
+
+        Castling rights are granted wherever a king and rook still stand on their home squares.
+        """
+        position = cls()
+        for y, row in enumerate(rows):
+            for x, piece in enumerate(row):
+                if piece:
+                    position._put(y * 8 + x, WHITE if piece[0] == 'w' else BLACK, PIECE_LETTERS.index(piece[1]))
+        position.side = side
+        for right, (king_sq, _, rook_sq, _, _) in CASTLING_MOVES.items():
+            colour = WHITE if right in CASTLING_RIGHTS_OF[WHITE] else BLACK
+            if position.mailbox[king_sq] == (colour, KING) and position.mailbox[rook_sq] == (colour, ROOK):
+                position.castling |= right
+        position._rebuild_attacks()
+        position._reset_hash()
+        return position
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.pieces = [self.pieces[WHITE][:], self.pieces[BLACK][:]]
+        position.occupied = self.occupied[:]
+        position.mailbox = self.mailbox[:]
+        position.side = self.side
+        position.castling = self.castling
+        position.ep_square = self.ep_square
+        position.halfmove_clock = self.halfmove_clock
+        position.fullmove_number = self.fullmove_number
+        position.undo_stack = []
+        position.hash = self.hash
+        position.repetitions = dict(self.repetitions)
+        position.king_squares = self.king_squares[:]
+        position.square_attacks = self.square_attacks[:]
+        position._attack_maps = self._attack_maps[:]
+        position._slider_maps = self._slider_maps[:]
+        return position
+
+    def _put(self, sq, colour, ptype):
+        bit = 1 << sq
+        self.pieces[colour][ptype] |= bit
+        self.occupied[colour] |= bit
+        self.mailbox[sq] = (colour, ptype)
+        self.hash ^= ZOBRIST_PIECES[colour][ptype][sq]
+        if ptype == KING:
+            self.king_squares[colour] = sq
+
+    def _remove(self, sq):
+        piece = self.mailbox[sq]
+        colour, ptype = piece
+        mask = ~(1 << sq)
+        self.pieces[colour][ptype] &= mask
+        self.occupied[colour] &= mask
+        self.mailbox[sq] = None
+        self.hash ^= ZOBRIST_PIECES[colour][ptype][sq]
+        if ptype == KING and self.king_squares[colour] == sq:
+            self.king_squares[colour] = None
+        return piece
+
+    def clear(self):
+        self.pieces = [[0] * 6, [0] * 6]
+        self.occupied = [0, 0]
+        self.mailbox = [None] * 64
+        self.side = WHITE
+        self.castling = 0
+        self.ep_square = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.undo_stack = []
+        self.hash = 0
+        self.repetitions = {}
+        self.king_squares = [None, None]
+        self.square_attacks = [0] * 64
+        self._attack_maps = [None, None]
+        self._slider_maps = [None, None]
+
+    # --- FEN ---
+
+    def set_fen(self, fen):
+        """Loads a FEN string.
+
+        Raises ValueError naming the field that is wrong if the FEN is malformed, in which case the
+        position is left as it was.
+        """
+        parts = fen.split()
+        if len(parts) != 6:
+            raise ValueError(f"FEN needs 6 fields (placement, side, castling, en passant, halfmove, fullmove), "
+                             f"got {len(parts)}")
+        placement, side, castling, ep, halfmove, fullmove = parts
+        mailbox = parse_placement(placement)
+        if side not in ('w', 'b'):
+            raise ValueError(f"Side to move must be 'w' or 'b', not '{side}'")
+        side = WHITE if side == 'w' else BLACK
+        # The side that just moved can't have left its king in check (its king could be taken)
+        pieces = Position()
+        for sq, piece in enumerate(mailbox):
+            if piece:
+                pieces._put(sq, *piece)
+        if pieces.is_attacked(pieces.king_squares[side ^ 1], side):
+            raise ValueError(f"The side not to move ({COLOUR_NAMES[side ^ 1]}) is in check")
+
+        rights = 0
+        if castling != '-':
+            for letter in castling:
+                right = CASTLING_RIGHT_OF_LETTER.get(letter)
+                if right is None or rights & right:
+                    raise ValueError(f"Bad castling field '{castling}': use K, Q, k and q at most once each, or '-'")
+                king_sq, _, rook_sq, _, _ = CASTLING_MOVES[right]
+                colour = WHITE if letter.isupper() else BLACK
+                if mailbox[king_sq] != (colour, KING) or mailbox[rook_sq] != (colour, ROOK):
+                    raise ValueError(f"Castling right '{letter}' needs a king on {SQUARE_NAMES[king_sq]} "
+                                     f"and a rook on {SQUARE_NAMES[rook_sq]}")
+                rights |= right
+
+        ep_square = None
+        if ep != '-':
+            ep_square = SQUARE_BY_NAME.get(ep)
+            if ep_square is None:
+                raise ValueError(f"Bad en passant square '{ep}'")
+            if ep_square >> 3 != (2 if side == WHITE else 5):
+                raise ValueError(f"En passant square '{ep}' must be on rank {6 if side == WHITE else 3} "
+                                 f"with {COLOUR_NAMES[side]} to move")
+
+        if not halfmove.isdigit():
+            raise ValueError(f"Halfmove clock must be a whole number, not '{halfmove}'")
+        if not fullmove.isdigit() or fullmove == '0':
+            raise ValueError(f"Fullmove number must be a whole number from 1, not '{fullmove}'")
+
+        # Everything is valid, so nothing below can fail halfway through
+        self.clear()
+        for sq, piece in enumerate(mailbox):
+            if piece:
+                self._put(sq, *piece)
+        self.side = side
+        self.castling = rights
+        self.ep_square = ep_square
+        self.halfmove_clock = int(halfmove)
+        self.fullmove_number = int(fullmove)
+        self._rebuild_attacks()
+        self._reset_hash()
+
+    # --- Hashing ---
+
+    def _state_hash(self):
+        """Zobrist keys of the side to move, castling rights and a capturable en passant square."""
+        key = ZOBRIST_CASTLING[self.castling]
+        if self.side == BLACK:
+            key ^= ZOBRIST_BLACK
+        ep = self.ep_square
+        # Only hash en passant when it can be taken, so otherwise identical positions repeat
+        if ep is not None and PAWN_ATTACKS[self.side ^ 1][ep] & self.pieces[self.side][PAWN]:
+            key ^= ZOBRIST_EP[ep & 7]
+        return key
+
+    def _reset_hash(self):
+        """Recomputes the hash from scratch and starts a fresh repetition history."""
+        key = self._state_hash()
+        for sq, piece in enumerate(self.mailbox):
+            if piece:
+                key ^= ZOBRIST_PIECES[piece[0]][piece[1]][sq]
+        self.hash = key
+        self.repetitions = {key: 1}
+
+    def is_repetition(self, count=3):
+        """Whether the current position has occurred `count` times (threefold by default)."""
+        return self.repetitions.get(self.hash, 0) >= count
+
+    def placement_fen(self):
+        rows = []
+        for y in range(8):
+            row, empty = '', 0
+            for piece in self.mailbox[y * 8:y * 8 + 8]:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = PIECE_LETTERS[piece[1]]
+                row += letter if piece[0] == WHITE else letter.lower()
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        return '/'.join(rows)
+
+    def castling_fen(self):
+        return ''.join(letter for right, letter in CASTLING_LETTERS if self.castling & right) or '-'
+
+    def fen(self):
+        ep = SQUARE_NAMES[self.ep_square] if self.ep_square is not None else '-'
+        side = 'w' if self.side == WHITE else 'b'
+        return f"{self.placement_fen()} {side} {self.castling_fen()} {ep} {self.halfmove_clock} {self.fullmove_number}"
+
+    # --- Attacks ---
+
+    def attackers_to(self, sq, by, occupied=None):
+        """Bitboard of `by`'s pieces attacking sq."""
+        pieces = self.pieces[by]
+        if occupied is None:
+            occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        return ((PAWN_ATTACKS[by ^ 1][sq] & pieces[PAWN])
+                | (KNIGHT_ATTACKS[sq] & pieces[KNIGHT])
+                | (KING_ATTACKS[sq] & pieces[KING])
+                | (bishop_attacks(sq, occupied) & (pieces[BISHOP] | pieces[QUEEN]))
+                | (rook_attacks(sq, occupied) & (pieces[ROOK] | pieces[QUEEN])))
+
+    def is_attacked(self, sq, by, occupied=None):
+        pieces = self.pieces[by]
+        if PAWN_ATTACKS[by ^ 1][sq] & pieces[PAWN] or KNIGHT_ATTACKS[sq] & pieces[KNIGHT] or KING_ATTACKS[sq] & pieces[KING]:
+            return True
+        if occupied is None:
+            occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        diagonal = pieces[BISHOP] | pieces[QUEEN]
+        if diagonal and bishop_attacks(sq, occupied) & diagonal:
+            return True
+        straight = pieces[ROOK] | pieces[QUEEN]
+        return bool(straight and rook_attacks(sq, occupied) & straight)
+
+    def _piece_attacks(self, sq, occupied):
+        colour, ptype = self.mailbox[sq]
+        if ptype == PAWN:
+            return PAWN_ATTACKS[colour][sq]
+        if ptype == KNIGHT:
+            return KNIGHT_ATTACKS[sq]
+        if ptype == KING:
+            return KING_ATTACKS[sq]
+        if ptype == BISHOP:
+            return bishop_attacks(sq, occupied)
+        if ptype == ROOK:
+            return rook_attacks(sq, occupied)
+        return bishop_attacks(sq, occupied) | rook_attacks(sq, occupied)
+
+    def _rebuild_attacks(self):
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        self.square_attacks = [self._piece_attacks(sq, occupied) if piece else 0 for sq, piece in enumerate(self.mailbox)]
+        self._attack_maps = [None, None]
+        self._slider_maps = [None, None]
+
+    def _refresh_attacks(self, changed):
+        """Updates square_attacks after the squares in the `changed` bitboard gained or lost a piece.
+
+        Only the changed squares and sliders whose rays reach one of them can attack differently.
+        """
+        square_attacks = self.square_attacks
+        occupied = self.occupied[WHITE] | self.occupied[BLACK]
+        white, black = self.pieces
+        sliders = (white[BISHOP] | white[ROOK] | white[QUEEN] | black[BISHOP] | black[ROOK] | black[QUEEN]) & ~changed
+        while sliders:
+            low = sliders & -sliders
+            sliders ^= low
+            sq = low.bit_length() - 1
+            if square_attacks[sq] & changed:
+                square_attacks[sq] = self._piece_attacks(sq, occupied)
+        while changed:
+            low = changed & -changed
+            changed ^= low
+            sq = low.bit_length() - 1
+            square_attacks[sq] = self._piece_attacks(sq, occupied) if occupied & low else 0
+        self._attack_maps = [None, None]
+        self._slider_maps = [None, None]
+
+    def attacks_from(self, sq):
+        """Bitboard of squares attacked by the piece on sq (0 if empty)."""
+        return self.square_attacks[sq]
+
+    def attack_map(self, colour):
+        """Bitboard of every square attacked by colour's pieces."""
+        attacks = self._attack_maps[colour]
+        if attacks is None:
+            attacks = 0
+            square_attacks = self.square_attacks
+            bb = self.occupied[colour]
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                attacks |= square_attacks[low.bit_length() - 1]
+            self._attack_maps[colour] = attacks
+        return attacks
+
+    def slider_attack_map(self, colour):
+        """Bitboard of every square seen by colour's bishops, rooks and queens."""
+        attacks = self._slider_maps[colour]
+        if attacks is None:
+            attacks = 0
+            square_attacks = self.square_attacks
+            pieces = self.pieces[colour]
+            bb = pieces[BISHOP] | pieces[ROOK] | pieces[QUEEN]
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                attacks |= square_attacks[low.bit_length() - 1]
+            self._slider_maps[colour] = attacks
+        return attacks
+
+    def king_square(self, colour):
+        return self.king_squares[colour]
+
+    def in_check(self, colour=None):
+        colour = self.side if colour is None else colour
+        king_sq = self.king_squares[colour]
+        return king_sq is not None and bool(self.attack_map(colour ^ 1) >> king_sq & 1)
+
+    # --- Move generation ---
+
+    def pseudo_legal_moves(self, colour=None, from_mask=BB_ALL):
+        """Moves for `colour` (default: side to move) that may leave their own king in check."""
+        us = self.side if colour is None else colour
+        them = us ^ 1
+        pieces = self.pieces[us]
+        own = self.occupied[us]
+        enemy = self.occupied[them]
+        occupied = own | enemy
+        moves = []
+        append = moves.append
+
+        # Pawns
+        forward, start_row, promotion_row = (-8, 6, 0) if us == WHITE else (8, 1, 7)
+        pawn_attacks = PAWN_ATTACKS[us]
+        capturable = enemy
+        if self.ep_square is not None and us == self.side:
+            capturable |= 1 << self.ep_square
+        bb = pieces[PAWN] & from_mask
+        while bb:
+            low = bb & -bb
+            sq = low.bit_length() - 1
+            bb ^= low
+            targets = pawn_attacks[sq] & capturable
+            push = sq + forward
+            if not (occupied >> push) & 1:
+                targets |= 1 << push
+                if sq >> 3 == start_row and not (occupied >> (push + forward)) & 1:
+                    append(sq | (push + forward) << 6)
+            while targets:
+                low = targets & -targets
+                to_sq = low.bit_length() - 1
+                targets ^= low
+                if to_sq >> 3 == promotion_row:
+                    for promotion in PROMOTION_PIECES:
+                        append(sq | to_sq << 6 | promotion << 12)
+                else:
+                    append(sq | to_sq << 6)
+
+        # Knights, sliders and king
+        not_own = ~own
+        for ptype in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            bb = pieces[ptype] & from_mask
+            while bb:
+                low = bb & -bb
+                sq = low.bit_length() - 1
+                bb ^= low
+                if ptype == KNIGHT:
+                    targets = KNIGHT_ATTACKS[sq]
+                elif ptype == KING:
+                    targets = KING_ATTACKS[sq]
+                elif ptype == BISHOP:
+                    targets = bishop_attacks(sq, occupied)
+                elif ptype == ROOK:
+                    targets = rook_attacks(sq, occupied)
+                else:
+                    targets = bishop_attacks(sq, occupied) | rook_attacks(sq, occupied)
+                targets &= not_own
+                while targets:
+                    low = targets & -targets
+                    targets ^= low
+                    append(sq | (low.bit_length() - 1) << 6)
+
+        # Castling, only when the king is not in check and does not cross an attacked square
+        if pieces[KING] & from_mask:
+            for right in CASTLING_RIGHTS_OF[us]:
+                if not self.castling & right:
+                    continue
+                king_sq, king_to, rook_sq, empty, crossed = CASTLING_MOVES[right]
+                if (occupied & empty or self.mailbox[king_sq] != (us, KING)
+                        or self.mailbox[rook_sq] != (us, ROOK)):
+                    continue
+                if not self.attack_map(them) & crossed:
+                    append(king_sq | king_to << 6)
+        return moves
+
+    def legal_moves(self, colour=None, from_mask=BB_ALL):
+        """Legal moves for colour, filtered by the checkers and pinned pieces of the position.
+
+        Other pieces' moves must land on the check-block mask and pinned pieces must stay on
+        their pin ray, so only the rare en passant capture is played out with make/unmake.
+        """
+        us = self.side if colour is None else colour
+        them = us ^ 1
+        king_sq = self.king_squares[us]
+        if king_sq is None:
+            return self.pseudo_legal_moves(us, from_mask)
+        own = self.occupied[us]
+        occupied = own | self.occupied[them]
+        enemy = self.pieces[them]
+
+        danger = self.attack_map(them)
+        check_mask = BB_ALL
+        if danger >> king_sq & 1:
+            checkers = self.attackers_to(king_sq, them, occupied)
+            if checkers & (checkers - 1):
+                from_mask &= 1 << king_sq  # double check, only the king can move
+            else:
+                check_mask = BETWEEN[king_sq][checkers.bit_length() - 1] | checkers
+            # The king can't step back along the line of a slider checking it
+            sliders = checkers & (enemy[BISHOP] | enemy[ROOK] | enemy[QUEEN])
+            while sliders:
+                low = sliders & -sliders
+                sliders ^= low
+                danger |= self._piece_attacks(low.bit_length() - 1, occupied ^ (1 << king_sq))
+
+        pin_rays = {}
+        snipers = ((ROOK_RAYS[king_sq] & (enemy[ROOK] | enemy[QUEEN]))
+                   | (BISHOP_RAYS[king_sq] & (enemy[BISHOP] | enemy[QUEEN])))
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            ray = BETWEEN[king_sq][low.bit_length() - 1]
+            blockers = ray & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pin_rays[blockers.bit_length() - 1] = ray | low
+
+        ep_square = self.ep_square if us == self.side else None
+        mailbox = self.mailbox
+        legal = []
+        for move in self.pseudo_legal_moves(us, from_mask):
+            from_sq, to_sq = move & 63, (move >> 6) & 63
+            if from_sq == king_sq:
+                if not danger >> to_sq & 1:
+                    legal.append(move)
+            elif to_sq == ep_square and mailbox[from_sq][1] == PAWN:
+                # En passant removes two pieces from a line at once, so just try it
+                self.make_move(move)
+                if not self.in_check(us):
+                    legal.append(move)
+                self.unmake_move()
+            elif check_mask >> to_sq & 1:
+                pin_ray = pin_rays.get(from_sq)
+                if pin_ray is None or pin_ray >> to_sq & 1:
+                    legal.append(move)
+        return legal
+
+    def has_legal_moves(self, colour=None):
+        return bool(self.legal_moves(colour))
+
+    def is_checkmate(self, colour=None):
+        return self.in_check(colour) and not self.has_legal_moves(colour)
+
+    def is_stalemate(self, colour=None):
+        return not self.in_check(colour) and not self.has_legal_moves(colour)
+
+    def parse_uci(self, uci):
+        """Returns the legal move matching a UCI string, or None if there isn't one."""
+        move = uci_to_move(uci)
+        if move is None or move not in self.legal_moves(from_mask=1 << (move & 63)):
+            return None
+        return move
+
+    # --- Making moves ---
+
+    def is_castling(self, move):
+        piece = self.mailbox[move & 63]
+        return piece is not None and piece[1] == KING and abs(((move >> 6) & 63) - (move & 63)) == 2
+
+    def is_en_passant(self, move):
+        piece = self.mailbox[move & 63]
+        to_sq = (move >> 6) & 63
+        return (piece is not None and piece[1] == PAWN and to_sq == self.ep_square
+                and (to_sq - (move & 63)) % 8 != 0)
+
+    def make_move(self, move):
+        """Plays a move (assumed pseudo-legal) and pushes what is needed to undo it."""
+        from_sq, to_sq, promotion = move & 63, (move >> 6) & 63, move >> 12
+        us, ptype = self.mailbox[from_sq]
+        captured_sq = to_sq
+        if ptype == PAWN and to_sq == self.ep_square and (to_sq - from_sq) % 8:
+            captured_sq = to_sq + 8 if us == WHITE else to_sq - 8
+        captured = self.mailbox[captured_sq]
+        prev_hash = self.hash
+        self.hash ^= self._state_hash()
+        changed = 1 << from_sq | 1 << to_sq | 1 << captured_sq
+        if captured is not None:
+            self._remove(captured_sq)
+        self._remove(from_sq)
+        self._put(to_sq, us, promotion or ptype)
+        if ptype == KING and abs(to_sq - from_sq) == 2:
+            rook_from, rook_to = (from_sq + 3, from_sq + 1) if to_sq > from_sq else (from_sq - 4, from_sq - 1)
+            self._remove(rook_from)
+            self._put(rook_to, us, ROOK)
+            changed |= 1 << rook_from | 1 << rook_to
+        self.undo_stack.append((move, captured, captured_sq, changed, prev_hash, self.side, self.castling,
+                                self.ep_square, self.halfmove_clock, self.fullmove_number))
+        self._refresh_attacks(changed)
+        self.castling &= CASTLING_MASK[from_sq] & CASTLING_MASK[to_sq]
+        self.ep_square = (from_sq + to_sq) >> 1 if ptype == PAWN and abs(to_sq - from_sq) == 16 else None
+        self.halfmove_clock = 0 if ptype == PAWN or captured is not None else self.halfmove_clock + 1
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.side = us ^ 1
+        self.hash ^= self._state_hash()
+        self.repetitions[self.hash] = self.repetitions.get(self.hash, 0) + 1
+
+    def unmake_move(self):
+        """Takes back the last move played with make_move."""
+        count = self.repetitions[self.hash] - 1
+        if count:
+            self.repetitions[self.hash] = count
+        else:
+            del self.repetitions[self.hash]
+        (move, captured, captured_sq, changed, prev_hash, self.side, self.castling,
+         self.ep_square, self.halfmove_clock, self.fullmove_number) = self.undo_stack.pop()
+        from_sq, to_sq = move & 63, (move >> 6) & 63
+        us, ptype = self._remove(to_sq)
+        if move >> 12:
+            ptype = PAWN
+        self._put(from_sq, us, ptype)
+        if ptype == KING and abs(to_sq - from_sq) == 2:
+            rook_from, rook_to = (from_sq + 3, from_sq + 1) if to_sq > from_sq else (from_sq - 4, from_sq - 1)
+            self._remove(rook_to)
+            self._put(rook_from, us, ROOK)
+        if captured is not None:
+            self._put(captured_sq, *captured)
+        self.hash = prev_hash
+        self._refresh_attacks(changed)
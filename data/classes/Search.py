@@ -0,0 +1,354 @@
+"""Built-in alpha-beta engine, so the game and the depth study work without a Stockfish binary.
+
+Iterative deepening negamax with a transposition table keyed by the Position's Zobrist hash,
+move ordering (hash move, MVV-LVA captures, killer moves, history heuristic) and a quiescence
+search over captures. Search answers like UciEngine (search(), stop(), new_game(), ...), so it
+can be dropped into an EnginePool in place of Stockfish.
+"""
+import threading
+import time
+
+from data.classes.Position import Position, WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, move_to_uci
+
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+MATE = 100000
+MATE_BOUND = MATE - 1000  # scores beyond this are mates
+INFINITY = MATE + 1
+MAX_PLY = 64
+EXACT, LOWER, UPPER = 0, 1, 2  # transposition table bound types
+
+# Piece-square tables from white's side, a8 first, matching Position's square order.
+# These are the "simplified evaluation function" tables from the Chess Programming Wiki.
+_PST = {
+    PAWN: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0),
+    KNIGHT: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50),
+    BISHOP: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20),
+    ROOK: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0),
+    QUEEN: (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20),
+    KING: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20),
+}
+_KING_ENDGAME_PST = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10, 0, 0, -10, -20, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 30, 40, 40, 30, -10, -30,
+    -30, -10, 20, 30, 30, 20, -10, -30,
+    -30, -30, 0, 0, 0, 0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50)
+
+# [colour][piece type][square] -> material + square bonus; black squares are mirrored (sq ^ 56)
+PIECE_SQUARE = [[[PIECE_VALUES[ptype] + _PST[ptype][sq if colour == WHITE else sq ^ 56] for sq in range(64)]
+                 for ptype in range(6)] for colour in (WHITE, BLACK)]
+KING_ENDGAME = [[_KING_ENDGAME_PST[sq if colour == WHITE else sq ^ 56] for sq in range(64)] for colour in (WHITE, BLACK)]
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)  # game phase: 24 with all minor and major pieces on, 0 with none
+TOTAL_PHASE = 24
+
+
+class SearchStopped(Exception):
+    """Raised inside the search when time is up or stop() was called."""
+
+
+def evaluate(position):
+    """Static evaluation in centipawns from the side to move's point of view."""
+    score = 0
+    phase = 0
+    for colour, sign in ((WHITE, 1), (BLACK, -1)):
+        tables = PIECE_SQUARE[colour]
+        for ptype in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN):
+            bb = position.pieces[colour][ptype]
+            table = tables[ptype]
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                score += sign * table[low.bit_length() - 1]
+                phase += PHASE_WEIGHTS[ptype]
+    phase = min(phase, TOTAL_PHASE)
+    # The king should hide in the middlegame and centralise in the endgame
+    for colour, sign in ((WHITE, 1), (BLACK, -1)):
+        king_sq = position.king_squares[colour]
+        if king_sq is not None:
+            middlegame = PIECE_SQUARE[colour][KING][king_sq]
+            endgame = KING_ENDGAME[colour][king_sq]
+            score += sign * (middlegame * phase + endgame * (TOTAL_PHASE - phase)) // TOTAL_PHASE
+    return score if position.side == WHITE else -score
+
+
+def score_to_uci(score):
+    """('cp', centipawns) or ('mate', moves), with negative mates when the side to move gets mated."""
+    if score > MATE_BOUND:
+        return ('mate', (MATE - score + 1) // 2)
+    if score < -MATE_BOUND:
+        return ('mate', -((MATE + score + 1) // 2))
+    return ('cp', score)
+
+
+class Search:
+    """In-process engine with the same search()/stop()/new_game() methods as UciEngine."""
+    def __init__(self, tt_size=1 << 20, max_time=None):
+        self.tt = {}  # Zobrist hash -> (depth, score, bound type, best move)
+        self.tt_size = tt_size  # entries kept before the table is cleared
+        self.max_time = max_time  # seconds a search without movetime may take, None for no limit
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]  # quiet moves that caused cutoffs, per ply
+        self.history = [[0] * 4096 for _ in (WHITE, BLACK)]  # [colour][from | to << 6] -> cutoff score
+        self.stop_event = threading.Event()  # stop() is called from other threads
+        self.deadline = None
+        self.nodes = 0
+        self.seldepth = 0
+        self.root_move = 0  # best move of the last root search
+
+    # --- UciEngine-compatible interface ---
+
+    def search(self, fen, depth=None, movetime=None, on_info=None):
+        """Searches a FEN and returns (best move in UCI notation or None, info of the last depth completed)."""
+        move, info = self.best_move(Position.from_fen(fen), depth, movetime, on_info)
+        return (move_to_uci(move) if move else None), info
+
+    def stop(self):
+        """Makes a running search return the best move found so far."""
+        self.stop_event.set()
+
+    def new_game(self):
+        self.tt.clear()
+        self.history = [[0] * 4096 for _ in (WHITE, BLACK)]
+
+    def set_option(self, name, value):
+        if name == "Hash":  # megabytes in UCI; roughly 10k entries per MB here
+            self.tt_size = int(value) * 10000
+
+    def ready(self):
+        pass
+
+    def quit(self):
+        self.stop()
+
+    # --- Search ---
+
+    def best_move(self, position, depth=None, movetime=None, on_info=None):
+        """Iterative deepening up to depth (or until movetime ms / stop()).
+
+        Returns (best move or None, info dict shaped like UciEngine's: depth, seldepth, score,
+        nodes, nps, time, pv). on_info is called with the info of every completed depth.
+        """
+        self.stop_event.clear()
+        position = position.copy()  # a stopped search unwinds without unmaking its moves
+        started = time.perf_counter()
+        limit = movetime / 1000 if movetime is not None else self.max_time
+        self.deadline = started + limit if limit is not None else None
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        max_depth = min(depth or MAX_PLY, MAX_PLY)
+
+        moves = position.legal_moves()
+        if not moves:
+            return None, {}
+        best_move, info = moves[0], {}
+        for current in range(1, max_depth + 1):
+            self.seldepth = 0
+            try:
+                score = self._negamax(position, current, -INFINITY, INFINITY, 0)
+            except SearchStopped:
+                break
+            best_move = self.root_move
+            elapsed = time.perf_counter() - started
+            info = {
+                "depth": current, "seldepth": self.seldepth, "score": score_to_uci(score),
+                "nodes": self.nodes, "nps": int(self.nodes / elapsed) if elapsed else 0,
+                "time": int(elapsed * 1000), "pv": [move_to_uci(move) for move in self._principal_variation(position)],
+            }
+            if on_info:
+                on_info(info)
+            if self.deadline is not None and elapsed > limit / 2:
+                break  # the next depth takes several times longer, so it wouldn't finish in time
+            if abs(score) > MATE_BOUND and MATE - abs(score) <= current:
+                break  # found the quickest mate, deeper won't change it
+        return best_move, info
+
+    def _check_time(self):
+        if self.stop_event.is_set() or (self.deadline is not None and time.perf_counter() >= self.deadline):
+            raise SearchStopped()
+
+    def _negamax(self, position, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_time()
+        if ply:
+            if position.halfmove_clock >= 100 or position.repetitions.get(position.hash, 0) >= 2:
+                return 0  # a repeated position is a draw as far as the search is concerned
+            if ply >= MAX_PLY:
+                return evaluate(position)
+
+        in_check = position.in_check()
+        if in_check:
+            depth += 1  # look one move further in checks so mates aren't cut off
+        if depth <= 0:
+            return self._quiescence(position, alpha, beta, ply)
+
+        key = position.hash
+        entry = self.tt.get(key)
+        hash_move = 0
+        if entry:
+            entry_depth, entry_score, bound, hash_move = entry
+            if ply and entry_depth >= depth:
+                # Mate scores are stored relative to the node, so move them back to this ply
+                if entry_score > MATE_BOUND:
+                    entry_score -= ply
+                elif entry_score < -MATE_BOUND:
+                    entry_score += ply
+                if (bound == EXACT or (bound == LOWER and entry_score >= beta)
+                        or (bound == UPPER and entry_score <= alpha)):
+                    return entry_score
+
+        moves = position.legal_moves()
+        if not moves:
+            return -MATE + ply if in_check else 0
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, 0
+        mailbox = position.mailbox
+        us = position.side
+        for move in self._order_moves(position, moves, hash_move, ply):
+            quiet = mailbox[(move >> 6) & 63] is None and not move >> 12
+            position.make_move(move)
+            score = -self._negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score > best_score:
+                best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if quiet:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1], killers[0] = killers[0], move
+                            self.history[us][move & 4095] += depth * depth
+                        break
+
+        if len(self.tt) >= self.tt_size:
+            self.tt.clear()
+        stored = best_score
+        if stored > MATE_BOUND:
+            stored += ply
+        elif stored < -MATE_BOUND:
+            stored -= ply
+        bound = UPPER if best_score <= original_alpha else LOWER if best_score >= beta else EXACT
+        self.tt[key] = (depth, stored, bound, best_move)
+        if not ply:
+            self.root_move = best_move
+        return best_score
+
+    def _quiescence(self, position, alpha, beta, ply):
+        """Searches captures and promotions only, until the position is quiet."""
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_time()
+        if ply > self.seldepth:
+            self.seldepth = ply
+        stand_pat = evaluate(position)
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        mailbox = position.mailbox
+        captures = [move for move in position.legal_moves() if mailbox[(move >> 6) & 63] is not None or move >> 12]
+        captures.sort(key=lambda move: self._capture_score(mailbox, move), reverse=True)
+        for move in captures:
+            position.make_move(move)
+            score = -self._quiescence(position, -beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    @staticmethod
+    def _capture_score(mailbox, move):
+        """MVV-LVA: most valuable victim first, then least valuable attacker."""
+        victim = mailbox[(move >> 6) & 63]
+        score = PIECE_VALUES[victim[1]] * 10 if victim else 0
+        if move >> 12:
+            score += PIECE_VALUES[move >> 12] * 10
+        return score - PIECE_VALUES[mailbox[move & 63][1]] // 10
+
+    def _order_moves(self, position, moves, hash_move, ply):
+        """Hash move, then captures by MVV-LVA, then killer moves, then quiet moves by history."""
+        mailbox = position.mailbox
+        killers = self.killers[ply]
+        history = self.history[position.side]
+
+        def order(move):
+            if move == hash_move:
+                return 1 << 30
+            if mailbox[(move >> 6) & 63] is not None or move >> 12:
+                return (1 << 24) + self._capture_score(mailbox, move)
+            if move == killers[0]:
+                return (1 << 23) + 1
+            if move == killers[1]:
+                return 1 << 23
+            return history[move & 4095]
+
+        return sorted(moves, key=order, reverse=True)
+
+    def _principal_variation(self, position):
+        """Follows hash moves from the position for the expected line of play."""
+        line = []
+        seen = set()
+        while len(line) < MAX_PLY and position.hash not in seen:
+            seen.add(position.hash)
+            entry = self.tt.get(position.hash)
+            if not entry or not entry[3] or entry[3] not in position.legal_moves():
+                break
+            line.append(entry[3])
+            position.make_move(entry[3])
+        for _ in line:
+            position.unmake_move()
+        return line
@@ -0,0 +1,28 @@
+import pygame
+
+# Decoded images and scaled copies, shared by every piece in the process
+_images = {}  # path -> Surface as decoded from disk
+_scaled = {}  # (name, colour, size) -> scaled Surface
+
+
+def get_piece_sprite(name, colour, size):
+    """Returns the sprite for a piece ('king', 'pawn', ...) scaled to size.
+
+    Each webp is decoded once and each size scaled once, so building a Board costs no image I/O
+    after the first one. The returned Surface is shared, so don't draw onto it.
+    """
+    key = (name, colour, size)
+    sprite = _scaled.get(key)
+    if sprite is None:
+        path = 'data/images/' + colour[0] + '_' + name + '.webp'
+        image = _images.get(path)
+        if image is None:
+            image = _images[path] = pygame.image.load(path).convert_alpha()
+        sprite = _scaled[key] = pygame.transform.smoothscale(image, size)
+    return sprite
+
+
+def piece_sprite(piece, tile_width, tile_height):
+    """The shared sprite to draw a Piece with on a tile of the given size."""
+    margin = piece.sprite_margin
+    return get_piece_sprite(piece.sprite_name, piece.colour, (tile_width - margin, tile_height - margin))
@@ -1,29 +1,71 @@
 import pygame
+from data.classes.Notation import square_name
+from data.classes.Sprites import piece_sprite
+
+# (normal, highlighted) fill colours of light and dark tiles
+LIGHT_COLOURS = ((220, 208, 194), (100, 249, 83))
+DARK_COLOURS = ((53, 53, 53), (0, 228, 10))
 
 # Tile creator
 class Square:
+    """A tile's game state. Its Rect and colours are derived when drawing, so Squares hold no pygame objects."""
+    __slots__ = ('x', 'y', 'pos', 'width', 'height', 'colour', 'occupying_piece', 'highlight')
+
     def __init__(self, x, y, width, height):
         self.x, self.y = x, y
         self.width, self.height = width, height
-        self.abs_x, self.abs_y = x * width, y * height
-        self.abs_pos = (self.abs_x, self.abs_y)
         self.pos = (x, y)
         self.colour = 'light' if (x + y) % 2 == 0 else 'dark'
-        self.draw_colour = (220, 208, 194) if self.colour == 'light' else (53, 53, 53)
-        self.highlight_colour = (100, 249, 83) if self.colour == 'light' else (0, 228, 10)
         self.occupying_piece = None
-        self.coord = self.get_coord()
         self.highlight = False
-        self.rect = pygame.Rect(self.abs_x, self.abs_y, self.width, self.height)
 
-    # get the formal notation of the tile
+    def copy(self):
+        """The same tile with a copy of its piece."""
+        square = Square.__new__(Square)
+        square.x, square.y, square.pos = self.x, self.y, self.pos
+        square.width, square.height, square.colour = self.width, self.height, self.colour
+        square.occupying_piece = self.occupying_piece.copy() if self.occupying_piece else None
+        square.highlight = False
+        return square
+
+    @property
+    def abs_x(self):
+        return self.x * self.width
+
+    @property
+    def abs_y(self):
+        return self.y * self.height
+
+    @property
+    def abs_pos(self):
+        return (self.abs_x, self.abs_y)
+
+    @property
+    def draw_colour(self):
+        return (LIGHT_COLOURS if self.colour == 'light' else DARK_COLOURS)[0]
+
+    @property
+    def highlight_colour(self):
+        return (LIGHT_COLOURS if self.colour == 'light' else DARK_COLOURS)[1]
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.x * self.width, self.y * self.height, self.width, self.height)
+
+    # get the formal notation of the tile, e.g. 'e4'
+    @property
+    def coord(self):
+        return square_name(self.x, self.y)
+
     def get_coord(self):
-        return 'abcdefgh'[self.x] + str(self.y + 1)
+        return square_name(self.x, self.y)
 
     def draw(self, display):
+        rect = self.rect
         colour = self.highlight_colour if self.highlight else self.draw_colour
-        pygame.draw.rect(display, colour, self.rect)
+        pygame.draw.rect(display, colour, rect)
         if self.occupying_piece:
-            centering_rect = self.occupying_piece.img.get_rect()
-            centering_rect.center = self.rect.center
-            display.blit(self.occupying_piece.img, centering_rect.topleft)
\ No newline at end of file
+            img = piece_sprite(self.occupying_piece, self.width, self.height)
+            centering_rect = img.get_rect()
+            centering_rect.center = rect.center
+            display.blit(img, centering_rect.topleft)
@@ -0,0 +1,234 @@
+import mmap
+import os
+import threading
+import time
+
+from data.classes.Position import WHITE, BLACK, ROOK, QUEEN, KING, KING_ATTACKS, rook_attacks, bishop_attacks
+
+# Table entries: ILLEGAL, DRAW, or plies to mate + 1 (a win for the strong side to move, a loss for the weak one)
+ILLEGAL = 255
+DRAW = 0
+STRONG_TO_MOVE, WEAK_TO_MOVE = 0, 1
+TABLE_SIZE = 2 * 64 * 64 * 64
+ESCAPES = 255  # move count marking a weak king that can take the piece, so it can never be lost
+
+
+def table_index(to_move, strong_king, weak_king, piece):
+    return to_move << 18 | strong_king << 12 | weak_king << 6 | piece
+
+
+def squares_of(bitboard):
+    while bitboard:
+        low = bitboard & -bitboard
+        yield low.bit_length() - 1
+        bitboard ^= low
+
+
+def piece_attacks(ptype, sq, occupied):
+    if ptype == ROOK:
+        return rook_attacks(sq, occupied)
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+def generate(ptype):
+    """Builds the K + queen/rook vs K table by retrograde analysis.
+
+    Starts from every checkmate and works backwards a ply at a time: a position where the strong
+    side can reach a lost position is won, and one where every move of the lone king reaches a won
+    position is lost. Whatever is left once that stops is a draw.
+    """
+    table = bytearray([ILLEGAL]) * TABLE_SIZE
+    moves_left = bytearray(TABLE_SIZE)  # weak-to-move positions: king moves not yet known to lose
+    lost = []
+    for strong_king in range(64):
+        for weak_king in range(64):
+            if weak_king == strong_king or KING_ATTACKS[strong_king] >> weak_king & 1:
+                continue
+            for piece in range(64):
+                if piece == strong_king or piece == weak_king:
+                    continue
+                kings = 1 << strong_king | 1 << weak_king
+                attacks = piece_attacks(ptype, piece, kings)
+                in_check = attacks >> weak_king & 1
+                if not in_check:
+                    table[table_index(STRONG_TO_MOVE, strong_king, weak_king, piece)] = DRAW
+                index = table_index(WEAK_TO_MOVE, strong_king, weak_king, piece)
+                table[index] = DRAW
+                # The king doesn't block the piece's line on the squares behind it
+                guarded = KING_ATTACKS[strong_king] | piece_attacks(ptype, piece, 1 << strong_king)
+                moves = 0
+                for target in squares_of(KING_ATTACKS[weak_king]):
+                    if target == piece and not KING_ATTACKS[strong_king] >> piece & 1:
+                        moves = ESCAPES  # takes the piece, only kings left
+                        break
+                    if not guarded >> target & 1 and target != piece:
+                        moves += 1
+                if moves == 0 and in_check:
+                    table[index] = 1  # checkmate
+                    lost.append(index)
+                moves_left[index] = moves
+
+    plies = 0
+    while lost:
+        won = []
+        for index in lost:
+            strong_king, weak_king, piece = index >> 12 & 63, index >> 6 & 63, index & 63
+            # Moves of the strong king or piece that led here
+            for before in squares_of(KING_ATTACKS[strong_king] & ~KING_ATTACKS[weak_king]):
+                if before != piece and before != weak_king:
+                    won.append(table_index(STRONG_TO_MOVE, before, weak_king, piece))
+            kings = 1 << strong_king | 1 << weak_king
+            for before in squares_of(piece_attacks(ptype, piece, kings) & ~kings):
+                won.append(table_index(STRONG_TO_MOVE, strong_king, weak_king, before))
+        next_lost = []
+        for index in won:
+            if table[index] != DRAW:
+                continue  # illegal, or already won sooner
+            table[index] = plies + 2
+            strong_king, weak_king, piece = index >> 12 & 63, index >> 6 & 63, index & 63
+            # Moves of the weak king that led here
+            for before in squares_of(KING_ATTACKS[weak_king] & ~KING_ATTACKS[strong_king]):
+                if before == piece or before == strong_king:
+                    continue
+                previous = table_index(WEAK_TO_MOVE, strong_king, before, piece)
+                if table[previous] != DRAW or moves_left[previous] == ESCAPES:
+                    continue
+                moves_left[previous] -= 1
+                if moves_left[previous] == 0:
+                    table[previous] = plies + 3
+                    next_lost.append(previous)
+        lost = next_lost
+        plies += 2
+    return table
+
+
+class Tablebase:
+    """Perfect play for king and queen or king and rook against a lone king.
+
+    Tables already saved in directory are memory-mapped straight away. Missing ones are generated by
+    retrograde analysis on a background thread (see build()), and probes of their positions return
+    None until they're ready, so nothing waits the seconds each table takes.
+    """
+    MATERIAL = {QUEEN: 'KQK', ROOK: 'KRK'}
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {}  # piece type -> mmap of its table
+        self.lock = threading.Lock()
+        self.builder = None  # thread generating the missing tables
+        for ptype in self.MATERIAL:
+            self.load(ptype)
+
+    def path(self, ptype):
+        return os.path.join(self.directory, self.MATERIAL[ptype] + '.bin')
+
+    def load(self, ptype):
+        """Maps the table's file if it's complete. Returns whether the table is ready."""
+        path = self.path(ptype)
+        if not os.path.exists(path) or os.path.getsize(path) != TABLE_SIZE:
+            return False
+        with open(path, 'rb') as f:
+            table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with self.lock:
+            self.tables[ptype] = table
+        return True
+
+    def missing(self):
+        with self.lock:
+            return [ptype for ptype in self.MATERIAL if ptype not in self.tables]
+
+    def generate_missing(self):
+        """Generates and saves every table that isn't on disk yet, blocking until they're done."""
+        for ptype in self.missing():
+            print(f"Generating the {self.MATERIAL[ptype]} tablebase...")
+            started = time.perf_counter()
+            table = generate(ptype)
+            path = self.path(ptype)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(table)
+            os.replace(path + '.tmp', path)
+            self.load(ptype)
+            print(f"Generated {path} in {time.perf_counter() - started:.1f}s")
+
+    def build(self):
+        """Starts generating the missing tables on a background thread, if that isn't already under way."""
+        with self.lock:
+            if self.builder is not None or len(self.tables) == len(self.MATERIAL):
+                return
+            self.builder = threading.Thread(target=self.generate_missing, name='tablebase-builder', daemon=True)
+        self.builder.start()
+
+    def table(self, ptype):
+        """The mmap of a table, or None while it's still being generated."""
+        with self.lock:
+            table = self.tables.get(ptype)
+        if table is None:
+            self.build()
+        return table
+
+    @classmethod
+    def material(cls, position):
+        """(strong colour, piece type) if the position is one the tables cover, else None."""
+        if position.castling or position.ep_square is not None:
+            return None
+        found = None
+        for colour in (WHITE, BLACK):
+            for ptype, bitboard in enumerate(position.pieces[colour]):
+                if ptype == KING or not bitboard:
+                    continue
+                if found or ptype not in cls.MATERIAL or bitboard & (bitboard - 1):
+                    return None
+                found = (colour, ptype)
+        return found
+
+    def probe(self, position):
+        """('win' | 'loss' | 'draw', plies to mate) for the side to move, or None if not covered (or not generated yet)."""
+        found = self.material(position)
+        if found is None:
+            return None
+        strong, ptype = found
+        piece = (position.pieces[strong][ptype]).bit_length() - 1
+        to_move = STRONG_TO_MOVE if position.side == strong else WEAK_TO_MOVE
+        table = self.table(ptype)
+        if table is None:
+            return None
+        value = table[table_index(to_move, position.king_squares[strong], position.king_squares[strong ^ 1], piece)]
+        if value == ILLEGAL:
+            return None
+        if value == DRAW:
+            return 'draw', 0
+        return ('win' if to_move == STRONG_TO_MOVE else 'loss'), value - 1
+
+    def best_move(self, position):
+        """(move, probe result) of the quickest win, slowest loss or a holding move, or None if not covered."""
+        result = self.probe(position)
+        if result is None or result[0] == 'loss' and result[1] == 0:
+            return None
+        best, best_score = None, None
+        for move in position.legal_moves():
+            position.make_move(move)
+            reply = self.probe(position) or ('draw', 0)  # e.g. the piece was taken
+            position.unmake_move()
+            outcome, plies = reply
+            # Scored for the side moving now: the opponent losing is our win
+            score = {'loss': 1000 - plies, 'draw': 0, 'win': plies - 1000}[outcome]
+            if best_score is None or score > best_score:
+                best, best_score = move, score
+        if best is None:
+            return None
+        return best, result
+
+    def close(self):
+        with self.lock:
+            tables, self.tables = self.tables, {}
+        for table in tables.values():
+            table.close()
+
+
+def describe(result):
+    """A probe result in words, e.g. 'win, mate in 7'."""
+    outcome, plies = result
+    if outcome == 'draw':
+        return 'draw'
+    return f"{outcome}, mate in {(plies + 1) // 2}"
@@ -0,0 +1,110 @@
+import subprocess
+import threading
+
+
+def parse_info(line):
+    """Parses a UCI 'info ...' line into a dict (depth, seldepth, multipv, score, nodes, nps, time, pv)."""
+    tokens = line.split()
+    info = {}
+    i = 1
+    while i < len(tokens):
+        token = tokens[i]
+        if token in ('depth', 'seldepth', 'multipv', 'nodes', 'nps', 'time', 'hashfull'):
+            if i + 1 < len(tokens) and tokens[i + 1].lstrip('-').isdigit():
+                info[token] = int(tokens[i + 1])
+            i += 2
+        elif token == 'score' and i + 2 < len(tokens):
+            # ('cp', 34) or ('mate', -3)
+            info['score'] = (tokens[i + 1], int(tokens[i + 2]))
+            i += 3
+        elif token == 'pv':
+            info['pv'] = tokens[i + 1:]
+            break
+        elif token == 'string':
+            break
+        else:
+            i += 1
+    return info
+
+
+class UciEngine:
+    """A UCI engine subprocess (e.g. Stockfish) driven over stdin/stdout."""
+    def __init__(self, path, options=None):
+        self.path = path
+        self.process = subprocess.Popen(
+            [path], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1,
+        )
+        self.write_lock = threading.Lock()  # stop() is sent from other threads mid-search
+        self.send('uci')
+        self.wait_for('uciok')
+        for name, value in (options or {}).items():
+            self.set_option(name, value)
+        self.ready()
+
+    def send(self, command):
+        with self.write_lock:
+            self.process.stdin.write(command + '\n')
+            self.process.stdin.flush()
+
+    def read_line(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError(f"UCI engine at {self.path} exited unexpectedly")
+        return line.strip()
+
+    def wait_for(self, token):
+        while True:
+            line = self.read_line()
+            if line.split(' ', 1)[0] == token:
+                return line
+
+    def ready(self):
+        self.send('isready')
+        self.wait_for('readyok')
+
+    def set_option(self, name, value):
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        self.send(f'setoption name {name} value {value}')
+
+    def new_game(self):
+        self.send('ucinewgame')
+        self.ready()
+
+    def search(self, fen, depth=None, movetime=None, on_info=None):
+        """Searches a position and returns (best move in UCI notation or None, last info dict).
+
+        on_info, if given, is called with every scored 'info' line while the search runs.
+        """
+        self.send(f'position fen {fen}')
+        if movetime is not None:
+            self.send(f'go movetime {int(movetime)}')
+        elif depth is not None:
+            self.send(f'go depth {depth}')
+        else:
+            self.send('go infinite')
+        last_info = {}
+        while True:
+            line = self.read_line()
+            if line.startswith('info '):
+                info = parse_info(line)
+                if 'score' in info:
+                    last_info = info
+                    if on_info:
+                        on_info(info)
+            elif line.startswith('bestmove'):
+                parts = line.split()
+                best_move = parts[1] if len(parts) > 1 and parts[1] != '(none)' else None
+                return best_move, last_info
+
+    def stop(self):
+        """Asks a running search to finish now; search() then returns the best move so far."""
+        self.send('stop')
+
+    def quit(self):
+        try:
+            self.send('quit')
+            self.process.wait(timeout=2)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self.process.kill()
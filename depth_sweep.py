@@ -0,0 +1,184 @@
+"""Headless engine-vs-engine depth sweep for the depth-vs-strategy study.
+
+Plays every pairing of (depth, Elo) settings from each starting position in parallel worker
+processes, and streams one JSON line per move (and per finished game) to the output file.
+
+Example:
+    python depth_sweep.py --positions start mid end --depths 4 8 12 --elos 1000 max --output sweep.jsonl
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from data.classes.Position import Position, WHITE, BLACK, KING, move_to_uci
+from data.classes.Search import Search
+from data.classes.UciEngine import UciEngine
+from presets import PRESETS, preset_fen
+
+SWEEP_ENGINE_OPTIONS = {"Threads": 1, "Hash": 64}  # one core per worker process
+
+_engines = {}  # per worker process: options key -> warm UciEngine
+
+
+def engine_options(elo):
+    options = dict(SWEEP_ENGINE_OPTIONS)
+    if elo is None:
+        options["UCI_LimitStrength"] = False
+    else:
+        options["UCI_LimitStrength"] = True
+        options["UCI_Elo"] = elo
+    return options
+
+
+def get_engine(path, elo):
+    """Reuses one engine per Elo setting for every game a worker plays.
+
+    The path 'builtin' selects the built-in engine, which has no Elo setting. Like in the game, it
+    plays its best move so far once it has thought for BUILTIN_MAX_TIME, so deep settings still finish.
+    """
+    key = (path, elo)
+    if key not in _engines:
+        if path == "builtin":
+            from engine import BUILTIN_MAX_TIME
+            _engines[key] = Search(max_time=BUILTIN_MAX_TIME)
+        else:
+            _engines[key] = UciEngine(path, engine_options(elo))
+    return _engines[key]
+
+
+def game_over(position, max_plies, plies):
+    """Returns (result, reason) when the game has ended, else None."""
+    if not position.legal_moves():
+        if position.in_check():
+            return ("0-1" if position.side == WHITE else "1-0"), "checkmate"
+        return "1/2-1/2", "stalemate"
+    if position.is_repetition(3):
+        return "1/2-1/2", "threefold repetition"
+    if position.halfmove_clock >= 100:
+        return "1/2-1/2", "fifty-move rule"
+    if position.occupied[WHITE] | position.occupied[BLACK] == position.pieces[WHITE][KING] | position.pieces[BLACK][KING]:
+        return "1/2-1/2", "only kings left"
+    if plies >= max_plies:
+        return "*", "ply limit"
+    return None
+
+
+def play_game(job, results):
+    """Plays one game in a worker process, putting a record on `results` after every move."""
+    game_id, engine_path, start_name, start_fen, white, black, max_plies = job
+    position = Position.from_fen(start_fen)
+    players = (white, black)
+    for settings in players:
+        get_engine(engine_path, settings["elo"]).new_game()
+    plies = 0
+    while True:
+        ended = game_over(position, max_plies, plies)
+        if ended:
+            break
+        settings = players[position.side]
+        engine = get_engine(engine_path, settings["elo"])
+        fen = position.fen()
+        started = time.perf_counter()
+        best_move, info = engine.search(fen, depth=settings["depth"])
+        elapsed = time.perf_counter() - started
+        move = position.parse_uci(best_move) if best_move else None
+        if move is None:
+            ended = ("*", f"engine returned illegal move {best_move}")
+            break
+        score = info.get("score")
+        results.put({
+            "type": "move", "game": game_id, "start": start_name, "ply": plies + 1,
+            "side": "white" if position.side == WHITE else "black",
+            "depth": settings["depth"], "elo": settings["elo"], "fen": fen, "move": move_to_uci(move),
+            "depth_reached": info.get("depth"), "score": list(score) if score else None,
+            "nodes": info.get("nodes"), "time_ms": round(elapsed * 1000, 1),
+        })
+        position.make_move(move)
+        plies += 1
+    result, reason = ended
+    record = {
+        "type": "game", "game": game_id, "start": start_name, "start_fen": start_fen,
+        "white": white, "black": black, "result": result, "reason": reason, "plies": plies,
+        "final_fen": position.fen(),
+    }
+    results.put(record)
+    return record
+
+
+def parse_elo(value):
+    return None if value.lower() in ("max", "none", "full") else int(value)
+
+
+def build_jobs(args, engine_path):
+    starts = [(name, preset_fen(name)) for name in args.positions]
+    if args.fen_file:
+        with open(args.fen_file) as fens:
+            starts += [(f"fen{i}", line.strip()) for i, line in enumerate(fens, 1) if line.strip()]
+    settings = [{"depth": depth, "elo": elo} for depth in args.depths for elo in args.elos]
+    jobs = []
+    for (start_name, start_fen), white, black in itertools.product(starts, settings, settings):
+        for _ in range(args.games):
+            jobs.append((len(jobs) + 1, engine_path, start_name, start_fen, white, black, args.max_plies))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine games across a matrix of depths and Elo settings.")
+    parser.add_argument("--positions", nargs="*", default=["start", "mid", "end"], choices=list(PRESETS),
+                        help="preset starting positions")
+    parser.add_argument("--fen-file", help="file with one extra starting FEN per line")
+    parser.add_argument("--depths", nargs="+", type=int, default=[4, 8, 12])
+    parser.add_argument("--elos", nargs="+", type=parse_elo, default=[1000],
+                        help="UCI_Elo values, or 'max' for full strength")
+    parser.add_argument("--games", type=int, default=1, help="games per pairing and starting position")
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument("--engine", help="UCI engine binary, or 'builtin' for the built-in engine "
+                                         "(default: the one engine.py uses)")
+    parser.add_argument("--output", default="depth_sweep.jsonl")
+    args = parser.parse_args()
+
+    if args.engine:
+        engine_path = args.engine
+    else:
+        from engine import resolve_engine
+        engine_path = resolve_engine()
+    if engine_path == "builtin" and args.elos != [None]:
+        print("The built-in engine has no Elo setting, playing each depth at full strength")
+        args.elos = [None]
+    if engine_path == "builtin":
+        from engine import BUILTIN_MAX_TIME
+        print(f"The built-in engine thinks for at most {BUILTIN_MAX_TIME:g}s a move, so deep settings may stop short of their depth")
+    jobs = build_jobs(args, engine_path)
+    print(f"Playing {len(jobs)} games on {args.workers} workers -> {args.output}")
+
+    with multiprocessing.Manager() as manager, open(args.output, "a") as output:
+        results = manager.Queue()
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(play_game, job, results) for job in jobs]
+            finished = 0
+            while finished < len(jobs):
+                try:
+                    record = results.get(timeout=0.5)
+                except queue.Empty:
+                    failed = [future for future in futures if future.done() and future.exception()]
+                    if failed:
+                        raise failed[0].exception()
+                    continue
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                if record["type"] == "game":
+                    finished += 1
+                    white, black = record["white"], record["black"]
+                    print(f"[{finished}/{len(jobs)}] {record['start']}: "
+                          f"d{white['depth']}/{white['elo'] or 'max'} vs d{black['depth']}/{black['elo'] or 'max'} "
+                          f"{record['result']} ({record['reason']}, {record['plies']} plies)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,365 @@
-from stockfish import Stockfish
+import atexit
 import os
-from data.classes.Board import Board
+import shutil
+import time
+from concurrent.futures import Future
+from data.classes.Analysis import Analyser
+from data.classes.EnginePool import EnginePool
+from data.classes.MoveCache import MoveCache
+from data.classes.Notation import uci_to_san
+from data.classes.OpeningBook import OpeningBook
+from data.classes.Position import move_to_uci
+from data.classes.Search import Search
+from data.classes.Tablebase import Tablebase, describe
+from data.classes.UciEngine import UciEngine
 
-STOCKFISH_PATH = "C:/Users/ethan/stockfish/stockfish.exe"
+# Set the STOCKFISH_PATH environment variable to use a different binary
+STOCKFISH_PATH = os.environ.get("STOCKFISH_PATH", "C:/Users/ethan/stockfish/stockfish.exe")
+POOL_SIZE = 2  # warm Stockfish processes kept running
 
-if "stockfish" not in globals():
-    stockfish = Stockfish(STOCKFISH_PATH)
-
-if not os.path.exists(STOCKFISH_PATH):
-    raise RuntimeError(f"Stockfish binary not found at: {STOCKFISH_PATH}. Please verify the path.")
-
-try:
-    stockfish = Stockfish(STOCKFISH_PATH)
-except FileNotFoundError:
-    raise RuntimeError(f"Stockfish failed to start. Check the binary at: {STOCKFISH_PATH}")
+# "stockfish", "builtin" (the pure-Python engine in data/classes/Search.py) or "auto", which uses
+# Stockfish when it can be found and the built-in engine otherwise. Set CHESS_ENGINE to override.
+ENGINE = os.environ.get("CHESS_ENGINE", "auto")
+BUILTIN_MAX_TIME = 10.0  # seconds the built-in engine may think before playing its best move so far
+MAX_SEARCH_FAILURES = 2  # failed Stockfish searches in a row before switching to the built-in engine
 
 # Configure Stockfish settings
-stockfish.update_engine_parameters({
+ENGINE_OPTIONS = {
     "Threads": 2,
     "Hash": 256,
     "UCI_LimitStrength": True,
     "UCI_Elo": 1000,
-})
-stockfish.set_depth(10)
+}
+search_depth = 10
+
+# How long the AI thinks: "depth" searches to search_depth whatever it takes, "movetime" thinks for
+# move_time ms, and "clock" splits a game clock of clock_time seconds plus clock_increment per move
+# over the game (see allocate_time). Use set_depth, set_movetime or set_clock to switch.
+time_mode = "depth"
+move_time = 1000
+clock_time = 300.0
+clock_increment = 2.0
+MIN_MOVE_TIME = 50  # ms, even when the clock is nearly out
+
+# Best moves already found by fixed-depth searches, keyed by position, depth and ENGINE_OPTIONS.
+# Set ENGINE_CACHE_PATH to a file (e.g. engine_cache.sqlite3) to keep them between runs.
+move_cache = MoveCache(max_size=10000, path=os.environ.get("ENGINE_CACHE_PATH"))
+
+# Polyglot opening book the AI plays from before asking the engine. Set OPENING_BOOK_PATH to use
+# another .bin file; without one every move is searched.
+BOOK_PATH = os.environ.get("OPENING_BOOK_PATH", "data/book.bin")
+
+# Endgame tablebase for king and queen or rook against king, generated into TABLEBASE_PATH on a
+# background thread (about 10 seconds per table, see tablebase.build()) and read from there afterwards.
+TABLEBASE_PATH = os.environ.get("TABLEBASE_PATH", "data/tablebases")
+TABLEBASE_MAX_PIECES = 3  # the most pieces (kings included) the tablebase has positions for
+tablebase = Tablebase(TABLEBASE_PATH)
+
+ANALYSIS_LINES = 3  # principal variations shown by the analysis overlay
+
+_pool = None
+_analyser = None
+_book = None
+_failures = 0  # searches that raised since the last one that worked
+_engine_path = None  # the Stockfish binary the AI uses, or "builtin"; see resolve_engine()
+
+
+def find_stockfish():
+    if os.path.exists(STOCKFISH_PATH):
+        return STOCKFISH_PATH
+    found = shutil.which("stockfish")
+    if found:
+        return found
+    raise RuntimeError(f"Stockfish binary not found at: {STOCKFISH_PATH}. Please verify the path.")
+
+
+def resolve_engine():
+    """The Stockfish binary searches run on, or "builtin" for the built-in engine.
+
+    Decided on the first call and kept afterwards, so the engine can't change under a running pool
+    (only search_failed() switches it). In "auto" mode that means looking for Stockfish once.
+    """
+    global _engine_path
+    if _engine_path is None:
+        if ENGINE == "builtin":
+            _engine_path = "builtin"
+        else:
+            try:
+                _engine_path = find_stockfish()
+            except RuntimeError:
+                # Forced Stockfish fails when the pool starts, which search_failed() reports
+                _engine_path = STOCKFISH_PATH if ENGINE == "stockfish" else "builtin"
+    return _engine_path
+
+
+def uses_builtin():
+    """Whether searches run on the built-in engine rather than Stockfish."""
+    return resolve_engine() == "builtin"
+
+
+def get_pool():
+    """Starts the engines on first use and keeps them warm afterwards."""
+    global _pool
+    if _pool is None:
+        if uses_builtin():
+            print("Using the built-in engine")
+            # One is enough: Python threads can't search in parallel
+            _pool = EnginePool(None, 1, factory=lambda: Search(max_time=BUILTIN_MAX_TIME))
+        else:
+            try:
+                _pool = EnginePool(resolve_engine(), POOL_SIZE, ENGINE_OPTIONS)
+            except OSError:
+                raise RuntimeError(f"Stockfish failed to start. Check the binary at: {STOCKFISH_PATH}")
+        atexit.register(shutdown)
+    return _pool
+
+
+def cache_options():
+    """Settings the engine's answer depends on, for the move cache key."""
+    return {"Engine": "builtin", "MaxTime": BUILTIN_MAX_TIME} if uses_builtin() else ENGINE_OPTIONS
+
+
+def set_depth(depth):
+    global search_depth, time_mode
+    search_depth = depth
+    time_mode = "depth"
+
+
+def set_movetime(milliseconds):
+    """Think for a fixed time on every move."""
+    global move_time, time_mode
+    move_time = milliseconds
+    time_mode = "movetime"
+
+
+def set_clock(seconds, increment=0.0):
+    """Play to a game clock: seconds for the whole game plus increment seconds per move."""
+    global clock_time, clock_increment, time_mode
+    clock_time, clock_increment = seconds, increment
+    time_mode = "clock"
+
+
+def allocate_time(remaining_ms, increment_ms, moves_played):
+    """Milliseconds to think on this move under a game clock.
+
+    An even share of the time left over the moves the game is still expected to last, plus most
+    of the increment, but never more than a third of what's left.
+    """
+    moves_left = max(20, 50 - moves_played)
+    budget = remaining_ms / moves_left + increment_ms * 3 / 4
+    return int(max(MIN_MOVE_TIME, min(budget, remaining_ms / 3)))
+
+
+def search_limits(board, time_used=0.0):
+    """depth and movetime for the next search; time_used is how long the side to move has spent so far."""
+    if time_mode == "movetime":
+        return {"depth": None, "movetime": move_time}
+    if time_mode == "clock":
+        moves_played = board.fullmove_number - 1
+        remaining = (clock_time + clock_increment * moves_played - time_used) * 1000
+        return {"depth": None, "movetime": allocate_time(remaining, clock_increment * 1000, moves_played)}
+    return {"depth": search_depth, "movetime": None}
+
+
+def get_book():
+    """Opens the opening book on first use; None if there isn't one."""
+    global _book
+    if _book is None and BOOK_PATH and os.path.exists(BOOK_PATH):
+        _book = OpeningBook(BOOK_PATH)
+        print(f"Opening book: {BOOK_PATH} ({_book.entries} entries)")
+    return _book
+
+
+def book_move(board):
+    """A weighted random book move for the board's position as (UCI move, weight, total weight), or None."""
+    book = get_book()
+    return book.choose(board.position) if book is not None else None
+
+
+def _few_pieces(position):
+    return bin(position.occupied[0] | position.occupied[1]).count('1') <= TABLEBASE_MAX_PIECES
+
+
+def probe_tablebase(board):
+    """('win' | 'loss' | 'draw', plies to mate) for the side to move if the tablebase has the position, else None."""
+    if not _few_pieces(board.position):
+        return None
+    return tablebase.probe(board.position)
+
+
+def tablebase_move(board):
+    """The tablebase's best move as (UCI move, probe result), or None if it doesn't have the position."""
+    if not _few_pieces(board.position):
+        return None
+    found = tablebase.best_move(board.position)
+    if found is None:
+        return None
+    move, result = found
+    return move_to_uci(move), result
+
 
 def set_stockfish_level(skill_level=8):
-    stockfish.set_skill_level(skill_level)
+    ENGINE_OPTIONS["Skill Level"] = skill_level
+    if _pool is not None:
+        _pool.configure({"Skill Level": skill_level})
 
-def get_best_move(board):
-    fen = board.get_fen() or "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+def request_best_move(board, time_used=0.0):
+    """Starts a background search for the board's position.
+
+    time_used is how many seconds the side to move has used on the game clock (for set_clock).
+    Returns a Future whose result() is (best move in UCI notation or None, last info dict).
+    result() raises CancelledError if cancel_requests() was called before the search finished.
+    """
+    fen = board.get_fen()
     print("Current FEN:", f"'{fen}'")
-    stockfish.set_fen_position(fen)
-    best_move = stockfish.get_best_move()
+    from_book = book_move(board)
+    if from_book is not None:
+        move, weight, total = from_book
+        print(f"AI move {move} ({uci_to_san(board.position, move)}): book ({weight}/{total} of the weight)")
+        future = Future()
+        future.set_result((move, {"book": True}))
+        return future
+    from_tablebase = tablebase_move(board)
+    if from_tablebase is not None:
+        move, result = from_tablebase
+        print(f"AI move {move} ({uci_to_san(board.position, move)}): tablebase ({describe(result)})")
+        future = Future()
+        future.set_result((move, {"tablebase": result}))
+        return future
+    limits = search_limits(board, time_used)
+    limit = f"movetime={limits['movetime']}" if limits["movetime"] is not None else limits["depth"]
+    started = time.perf_counter()
+    position = board.position.copy()  # for the log's SAN, which is written from the engine's thread
+    # Only fixed-depth searches are cached: a time-limited one reaches a different depth every time
+    key = move_cache.make_key(fen, limits["depth"], cache_options()) if limits["movetime"] is None else None
+    cached = move_cache.get(key) if key is not None else None
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        _log_result(future, position, started, limit, cached=True)
+        return future
+    future = get_pool().submit(fen, **limits)
+    future.add_done_callback(_count_failure)
+    if key is not None:
+        future.add_done_callback(lambda search: _store_result(key, limits["depth"], search))
+    future.add_done_callback(lambda search: _log_result(search, position, started, limit))
+    return future
+
+
+def _count_failure(search):
+    global _failures
+    if not search.cancelled() and search.exception() is None:
+        _failures = 0
+
+
+def search_failed(error):
+    """Records a search that raised, e.g. because Stockfish exited. Returns whether to ask again.
+
+    The pool restarts a failed engine, so the search is simply retried at first; after
+    MAX_SEARCH_FAILURES in a row the AI switches to the built-in engine, and gives up if that fails too.
+    """
+    global _engine_path, _pool, _failures
+    _failures += 1
+    print(f"AI search failed ({_failures} in a row): {error}")
+    if _failures < MAX_SEARCH_FAILURES:
+        return True
+    if uses_builtin():
+        print("The built-in engine failed too, the AI won't move")
+        return False
+    print("Switching to the built-in engine")
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+    _engine_path = "builtin"
+    _failures = 0
+    return True
+
+
+def _store_result(key, depth, search):
+    """Caches a finished search, unless BUILTIN_MAX_TIME cut it off before it reached depth.
+
+    A mate score counts as complete: the built-in engine stops early once it has the quickest mate.
+    """
+    if search.cancelled() or search.exception() is not None:
+        return
+    best_move, info = search.result()
+    if info.get("depth", 0) >= depth or info.get("score", ("cp",))[0] == "mate":
+        move_cache.put(key, best_move, info)
+
+
+def _log_result(search, position, started, limit, cached=False):
+    """Prints how long the AI took and how deep it got, to compare against the time it was given."""
+    if search.cancelled() or search.exception() is not None:
+        return
+    best_move, info = search.result()
+    latency = (time.perf_counter() - started) * 1000
+    source = "cache" if cached else f"depth {info.get('depth')}"
+    san = uci_to_san(position, best_move) if best_move else None
+    print(f"AI move {best_move} ({san}): {source} in {latency:.0f} ms (limit {limit})")
+
+
+def get_best_move(board):
+    """Blocking search, returns the best move in UCI notation (or None)."""
+    best_move, _ = request_best_move(board).result()
     print("Best move:", best_move)
     return best_move
+
+
+def cache_stats():
+    """Hit/miss counters of the best-move cache."""
+    return move_cache.stats()
+
+
+def cancel_requests():
+    """Cancels every queued or running search, e.g. when the game is paused or restarted."""
+    if _pool is not None:
+        _pool.cancel_all()
+
+
+def start_analysis(on_update=None):
+    """Starts the background analysis engine (full strength, ANALYSIS_LINES lines) on first use.
+
+    on_update is called from the analysis thread when new lines are ready to draw.
+    """
+    global _analyser
+    if _analyser is None:
+        if uses_builtin():
+            analysis_engine = Search()
+        else:
+            analysis_engine = UciEngine(resolve_engine(), {"Threads": ENGINE_OPTIONS["Threads"], "Hash": ENGINE_OPTIONS["Hash"]})
+        _analyser = Analyser(analysis_engine, ANALYSIS_LINES, on_update)
+        atexit.register(shutdown)
+    return _analyser
+
+
+def analyse_position(board):
+    """Points the background analysis at the board's position; cheap when it hasn't changed."""
+    start_analysis().analyse(board.get_fen())
+
+
+def analysis_lines():
+    """The latest info dict of each analysis line (best first) and a version number that changes with them."""
+    if _analyser is None:
+        return [], 0
+    return _analyser.get_lines()
+
+
+def stop_analysis():
+    if _analyser is not None:
+        _analyser.analyse(None)
+
+
+def shutdown():
+    global _pool, _analyser, _book
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+    if _analyser is not None:
+        _analyser.shutdown()
+        _analyser = None
+    if _book is not None:
+        _book.close()
+        _book = None
+    tablebase.close()
+    move_cache.close()
@@ -1,9 +1,18 @@
+import os
 import pygame
 import sys
 import time
+from datetime import date
 import pyperclip
+from concurrent.futures import CancelledError
+from functools import partial
 from data.classes.Board import Board
-from engine import get_best_move
+from data.classes.FrameClock import FrameClock
+from data.classes.Notation import uci_to_xy
+from data.classes.Pgn import format_game
+import engine
+from engine import request_best_move, cancel_requests, analyse_position, analysis_lines, start_analysis, stop_analysis, ANALYSIS_LINES
+from presets import PRESETS
 
 # Initialise Pygame
 pygame.init()
@@ -23,6 +32,7 @@ pvp_icon = pygame.transform.scale(pvp_icon, (ICON_SIZE, ICON_SIZE))
 # Fonts and Colours
 font = pygame.font.Font(None, 50)
 small_font = pygame.font.Font(None, 30)
+analysis_font = pygame.font.Font(None, 24)
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 BUTTON_COLOUR = (50, 150, 255)
@@ -31,6 +41,24 @@ BUTTON_HOVER = (30, 130, 230)
 current_game_mode = "pvp"
 current_preset = None
 current_fen = None
+analysis_on = False  # 'A' toggles the engine analysis overlay during a game
+analysis_drawn = None  # version of the analysis lines last drawn
+ANALYSIS_LINE_HEIGHT = 20
+
+# Every game is appended here as PGN when it ends or is left. Set CHESS_PGN_PATH to change it.
+PGN_PATH = os.environ.get("CHESS_PGN_PATH", "games.pgn")
+
+# Frame rate cap for every screen; idle screens sleep until there's input.
+# Set CHESS_FPS to change the cap and CHESS_FRAME_STATS=1 to show frame times in the title bar.
+FPS_CAP = int(os.environ.get("CHESS_FPS", 60))
+
+
+def show_frame_stats(stats):
+    pygame.display.set_caption(f"Chess Game - {stats['fps']} fps, "
+                               f"{stats['frame_ms']:.1f} ms/frame (max {stats['max_frame_ms']:.1f} ms)")
+
+
+frame_clock = FrameClock(FPS_CAP, on_stats=show_frame_stats if os.environ.get("CHESS_FRAME_STATS") else None)
 
 
 class Button:
@@ -55,18 +83,34 @@ class Button:
         self.hovered = self.rect.collidepoint(mouse_pos)
 
     def handle_event(self, event):
-        """Handles button clicks."""
+        """Handles button clicks, returning whatever the callback returns (e.g. the next screen)."""
         if event.type == pygame.MOUSEBUTTONDOWN and self.hovered:
-            self.callback()
+            return self.callback()
+        return None
+
+def run(scene):
+    """Top-level loop. Each screen runs until the player leaves it and returns the next screen to show
+    (a function taking no arguments), so moving between screens never nests calls or keeps old Boards alive.
+    """
+    while scene is not None:
+        scene = scene()
+
+def handle_buttons(event, buttons):
+    """Passes an event to the buttons, returning the next screen if one was clicked."""
+    for button in buttons:
+        next_scene = button.handle_event(event)
+        if next_scene:
+            return next_scene
+    return None
 
 def main_menu():
     """Displays the main menu with game mode selection."""
     
-    # Define buttons
-    start_ai_button = Button("AI Mode", window_size[0]//2 - 150, 260, 300, 60, lambda: main(game_mode="ai"))
-    preset_ai_button = Button("AI Preset", window_size[0]//2 - 150, 330, 300, 60, preset_menu_ai)
-    start_pvp_button = Button("2-Player Mode", window_size[0]//2 - 150, 400, 300, 60, lambda: main(game_mode="pvp"))
-    preset_pvp_button = Button("PVP Preset", window_size[0]//2 - 150, 470, 300, 60, preset_menu_pvp)
+    # Define buttons (their callbacks return the screen to go to)
+    start_ai_button = Button("AI Mode", window_size[0]//2 - 150, 260, 300, 60, lambda: partial(main, game_mode="ai"))
+    preset_ai_button = Button("AI Preset", window_size[0]//2 - 150, 330, 300, 60, lambda: preset_menu_ai)
+    start_pvp_button = Button("2-Player Mode", window_size[0]//2 - 150, 400, 300, 60, lambda: partial(main, game_mode="pvp"))
+    preset_pvp_button = Button("PVP Preset", window_size[0]//2 - 150, 470, 300, 60, lambda: preset_menu_pvp)
     quit_button = Button("Quit", window_size[0]//2 - 100, 550, 200, 50, sys.exit)
     board = Board(window_size[0], window_size[1])
 
@@ -74,13 +118,6 @@ def main_menu():
         board.draw(screen)
         draw_text("Chess Game", font, WHITE, screen, window_size[0]//2, 150)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            for button in [start_ai_button, preset_ai_button, start_pvp_button, preset_pvp_button, quit_button]:
-                button.handle_event(event)
-
         # Handle hover effects and draw buttons
         mouse_pos = pygame.mouse.get_pos()
         for button in [start_ai_button, preset_ai_button, start_pvp_button, preset_pvp_button, quit_button]:
@@ -99,26 +136,27 @@ def main_menu():
 
         pygame.display.update()
 
+        for event in frame_clock.events():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            next_scene = handle_buttons(event, [start_ai_button, preset_ai_button, start_pvp_button, preset_pvp_button, quit_button])
+            if next_scene:
+                return next_scene
+
 def preset_menu_ai():
     """Preset menu for AI mode."""
-    start_button = Button("Start Game", window_size[0]//2 - 150, 250, 300, 60, lambda: main("ai", preset="start"))
-    mid_button = Button("Mid Game", window_size[0]//2 - 150, 330, 300, 60, lambda: main("ai", preset="mid"))
-    end_button = Button("End Game", window_size[0]//2 - 150, 410, 300, 60, lambda: main("ai", preset="end"))
-    fen_button = Button("Custom FEN", window_size[0]//2 - 150, 490, 300, 60, fen_input_screen)
-    back_button = Button("Back", window_size[0]//2 - 100, 560, 200, 60, main_menu)
+    start_button = Button("Start Game", window_size[0]//2 - 150, 250, 300, 60, lambda: partial(main, "ai", preset="start"))
+    mid_button = Button("Mid Game", window_size[0]//2 - 150, 330, 300, 60, lambda: partial(main, "ai", preset="mid"))
+    end_button = Button("End Game", window_size[0]//2 - 150, 410, 300, 60, lambda: partial(main, "ai", preset="end"))
+    fen_button = Button("Custom FEN", window_size[0]//2 - 150, 490, 300, 60, lambda: fen_input_screen)
+    back_button = Button("Back", window_size[0]//2 - 100, 560, 200, 60, lambda: main_menu)
     board = Board(window_size[0], window_size[1])
 
     while True:
         board.draw(screen)
         draw_text("AI Preset Menu", font, WHITE, screen, window_size[0]//2, 150)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            for button in [start_button, mid_button, end_button, fen_button, back_button]:
-                button.handle_event(event)
-
         mouse_pos = pygame.mouse.get_pos()
         for button in [start_button, mid_button, end_button, fen_button, back_button]:
             button.check_hover(mouse_pos)
@@ -126,12 +164,20 @@ def preset_menu_ai():
 
         pygame.display.update()
 
+        for event in frame_clock.events():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            next_scene = handle_buttons(event, [start_button, mid_button, end_button, fen_button, back_button])
+            if next_scene:
+                return next_scene
+
 def preset_menu_pvp():
     """Preset menu for Player vs Player mode."""
-    start_button = Button("Start Game", window_size[0]//2 - 150, 250, 300, 60, lambda: main("pvp", preset="start"))
-    mid_button = Button("Mid Game", window_size[0]//2 - 150, 330, 300, 60, lambda: main("pvp", preset="mid"))
-    end_button = Button("End Game", window_size[0]//2 - 150, 410, 300, 60, lambda: main("pvp", preset="end"))
-    back_button = Button("Back", window_size[0]//2 - 100, 490, 200, 60, main_menu)
+    start_button = Button("Start Game", window_size[0]//2 - 150, 250, 300, 60, lambda: partial(main, "pvp", preset="start"))
+    mid_button = Button("Mid Game", window_size[0]//2 - 150, 330, 300, 60, lambda: partial(main, "pvp", preset="mid"))
+    end_button = Button("End Game", window_size[0]//2 - 150, 410, 300, 60, lambda: partial(main, "pvp", preset="end"))
+    back_button = Button("Back", window_size[0]//2 - 100, 490, 200, 60, lambda: main_menu)
     board = Board(window_size[0], window_size[1])
 
     while True:
@@ -139,13 +185,6 @@ def preset_menu_pvp():
 
         draw_text("PVP Preset Menu", font, WHITE, screen, window_size[0]//2, 150)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            for button in [start_button, mid_button, end_button, back_button]:
-                button.handle_event(event)
-
         mouse_pos = pygame.mouse.get_pos()
         for button in [start_button, mid_button, end_button, back_button]:
             button.check_hover(mouse_pos)
@@ -153,21 +192,25 @@ def preset_menu_pvp():
 
         pygame.display.update()
 
+        for event in frame_clock.events():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            next_scene = handle_buttons(event, [start_button, mid_button, end_button, back_button])
+            if next_scene:
+                return next_scene
+
 def fen_input_screen():
     """Allows the user to input a custom FEN string with live preview."""
     input_box = pygame.Rect(window_size[0]//2 - 250, 300, 500, 50)
     user_text = ''
     error_message = ''
-    active = True
-
-    def is_valid_fen(fen):
-        parts = fen.strip().split()
-        return len(parts) == 6 and all(parts)
 
     preview_board = Board(window_size[0] // 2, window_size[1] // 2)
     valid_preview = False
+    preview_error = ''
 
-    while active:
+    while True:
         screen.fill(WHITE)
         draw_text("Enter Custom FEN:", font, BLACK, screen, window_size[0]//2, 40)
         pygame.draw.rect(screen, BLACK, input_box, 2)
@@ -179,10 +222,11 @@ def fen_input_screen():
 
         # Try to render the FEN as a preview
         try:
-            preview_board.set_fen(user_text)
+            preview_board.set_fen(user_text)  # only parses when the text has changed
             valid_preview = True
-        except Exception as e:
+        except ValueError as e:
             valid_preview = False
+            preview_error = str(e)
 
         if valid_preview:
             preview_board.draw(screen)
@@ -192,57 +236,61 @@ def fen_input_screen():
         if error_message:
             draw_text(error_message, small_font, (200, 0, 0), screen, window_size[0]//2, 370)
 
-        for event in pygame.event.get():
+        pygame.display.update()
+
+        for event in frame_clock.events():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:
-                    if is_valid_fen(user_text):
-                        main(game_mode='ai', fen=user_text)
-                        active = False
+                    if valid_preview:
+                        return partial(main, game_mode='ai', fen=user_text)
                     else:
-                        error_message = "Invalid FEN. Please enter a full valid FEN string."
+                        error_message = f"Invalid FEN: {preview_error}"
                 elif event.key == pygame.K_BACKSPACE:
                     user_text = user_text[:-1]
                 elif event.key == pygame.K_ESCAPE:
-                    preset_menu_ai()
-                    return
+                    return preset_menu_ai
                 else:
                     user_text += event.unicode
 
-        pygame.display.update()
-
 def pause_menu(board_surface=None):
-    """Pause menu that appears when ESC is pressed."""
+    """Pause menu that appears when ESC is pressed.
+
+    Returns None to resume the game, or the screen to go to if the player quits it.
+    """
     global paused
     paused = True  # Set paused state
     resume_button = Button("Resume", window_size[0]//2 - 100, 300, 200, 60, lambda: set_paused(False))
-    quit_button = Button("Quit to Menu", window_size[0]//2 - 100, 400, 200, 60, main_menu)
+    quit_button = Button("Quit to Menu", window_size[0]//2 - 100, 400, 200, 60, lambda: main_menu)
     while paused:  # Stay in pause menu until unpaused
         if board_surface:
             screen.blit(board_surface, (0, 0))  # Show the frozen board
         else:
             screen.fill(WHITE)
         draw_text("Paused", font, WHITE, screen, window_size[0]//2, 200)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                set_paused(False)  # Resume game if ESC is pressed again
-            for button in [resume_button, quit_button]:
-                button.handle_event(event)
         mouse_pos = pygame.mouse.get_pos()
         for button in [resume_button, quit_button]:
             button.check_hover(mouse_pos)
             button.draw(screen)
         pygame.display.update()
+        for event in frame_clock.events():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                set_paused(False)  # Resume game if ESC is pressed again
+            next_scene = handle_buttons(event, [resume_button, quit_button])
+            if next_scene:
+                paused = False
+                return next_scene
+    return None
 
 def end_screen(message, time_str, final_board_surface=None, last_move=None):
     """Displays the end screen with game results and buttons."""
     restart_button = Button("Restart", window_size[0]//2 - 100, 350, 200, 60, restart_game)
-    menu_button = Button("Main Menu", window_size[0]//2 - 100, 420, 200, 60, main_menu)
+    menu_button = Button("Main Menu", window_size[0]//2 - 100, 420, 200, 60, lambda: main_menu)
     quit_button = Button("Quit", window_size[0]//2 - 100, 490, 200, 60, quit_game)
     
     # Create a transparent grey overlay
@@ -270,13 +318,6 @@ def end_screen(message, time_str, final_board_surface=None, last_move=None):
         draw_text(message, font, WHITE, screen, window_size[0]//2, 250)
         draw_text(time_str, small_font, WHITE, screen, window_size[0]//2, 300)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                quit_game()  # Ensures proper quitting
-
-            for button in [restart_button, menu_button, quit_button]:
-                button.handle_event(event)
-
         mouse_pos = pygame.mouse.get_pos()
         for button in [restart_button, menu_button, quit_button]:
             button.check_hover(mouse_pos)
@@ -284,13 +325,21 @@ def end_screen(message, time_str, final_board_surface=None, last_move=None):
 
         pygame.display.update()
 
+        for event in frame_clock.events():
+            if event.type == pygame.QUIT:
+                quit_game()  # Ensures proper quitting
+
+            next_scene = handle_buttons(event, [restart_button, menu_button, quit_button])
+            if next_scene:
+                return next_scene
+
 def quit_game():
     """Returns to the main menu."""
     sys.exit()
 
 def restart_game():
-    """Restarts the game by reinitialising the board."""
-    main(current_game_mode, current_preset, current_fen)
+    """Returns a fresh game with the same mode and starting position."""
+    return partial(main, current_game_mode, current_preset, current_fen)
 
 def set_paused(value):
     """Updates the paused state to resume the game."""
@@ -308,21 +357,37 @@ def initialise_game(config=None):
     board = Board(window_size[0], window_size[1], config)
     return board
 
-def handle_events(board):
-    """Handles user input, including ESC for pausing."""
+def handle_events(board, busy=False):
+    """Handles user input, including ESC for pausing. Waits for input unless busy.
+
+    Returns the screen to go to if the player leaves the game, else None.
+    """
     global paused
-    for event in pygame.event.get():
+    for event in frame_clock.events(busy):
         if event.type == pygame.QUIT:
-            main_menu()  # If the user closes the game, go to the main menu
-            return False
+            return main_menu  # If the user closes the game, go to the main menu
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE: # Open the pause menu if ESC is pressed
+                cancel_requests()  # the AI asks again once the game resumes
                 board_surface = screen.copy()
-                pause_menu(board_surface)  # Pass current board snapshot
+                next_scene = pause_menu(board_surface)  # Pass current board snapshot
+                if next_scene:
+                    return next_scene
+                board.invalidate()  # the pause menu painted over the board
+            elif event.key == pygame.K_a:  # Toggle the analysis overlay
+                toggle_analysis(board)
+            elif event.key == pygame.K_BACKSPACE and board.undo_stack:  # Take back a move
+                cancel_requests()
+                # Against the AI, take back its reply too so it's the player's turn again
+                plies = 2 if current_game_mode == "ai" and board.turn == "white" else 1
+                for _ in range(min(plies, len(board.undo_stack))):
+                    board.unmake_move()
         elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if current_game_mode == "ai" and board.turn == "black":
+                continue  # the AI is thinking, ignore clicks on its pieces
             mx, my = pygame.mouse.get_pos()
             board.handle_click(mx, my)
-    return True
+    return None
 
 def check_game_status(board):
     """Checks if the game has ended and returns the result."""
@@ -334,6 +399,8 @@ def check_game_status(board):
         return "Draw! (Stalemate)"
     elif only_kings_left(board):
         return "Draw! Only Kings Left."
+    elif board.is_threefold_repetition():
+        return "Draw! (Threefold Repetition)"
     return None  # Game still ongoing
 
 def only_kings_left(board):
@@ -341,100 +408,236 @@ def only_kings_left(board):
     pieces = [square.occupying_piece for square in board.squares if square.occupying_piece]
     return all(piece.notation == 'K' for piece in pieces)
 
-def draw(display, board):
-    """Draws the game board."""
-    display.fill(WHITE)
-    board.draw(display)
-    pygame.display.update()
+def toggle_analysis(board):
+    """Shows or hides the analysis overlay; the engine analyses in the background while it's shown."""
+    global analysis_on, analysis_drawn
+    analysis_on = not analysis_on
+    analysis_drawn = None
+    if analysis_on:
+        start_analysis(on_update=frame_clock.wake)  # redraw as soon as new lines arrive
+    else:
+        stop_analysis()
+    board.invalidate()
+
+def format_score(score, white_to_move):
+    """A UCI score ('cp', 35) or ('mate', -2) from white's point of view, e.g. '+0.35' or '-M2'."""
+    kind, value = score
+    if not white_to_move:
+        value = -value
+    if kind == 'mate':
+        return f"{'-' if value < 0 else ''}M{abs(value)}"
+    return f"{value / 100:+.2f}"
+
+def analysis_rect(board):
+    """Where the overlay goes: across the bottom of the board."""
+    height = ANALYSIS_LINE_HEIGHT * (ANALYSIS_LINES + 1) + 10
+    bottom = board.tile_height * 8
+    return pygame.Rect(0, bottom - height, board.tile_width * 8, height)
+
+def draw_analysis(display, board, lines):
+    """Draws the engine's best lines over the bottom of the board."""
+    rect = analysis_rect(board)
+    panel = pygame.Surface(rect.size, pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 170))
+    white_to_move = board.turn == "white"
+    header = "Analysis: waiting for engine..."
+    if lines:
+        best = lines[0]
+        header = f"Analysis: depth {best.get('depth', 0)}, {best.get('nps', 0) / 1000:.0f} kN/s"
+    texts = [header]
+    for number, info in enumerate(lines[:ANALYSIS_LINES], 1):
+        score = format_score(info['score'], white_to_move) if 'score' in info else "?"
+        texts.append(f"{number}. {score}  d{info.get('depth', 0)}  {' '.join(info.get('pv', [])[:8])}")
+    for i, text in enumerate(texts):
+        panel.blit(analysis_font.render(text, True, WHITE), (10, 5 + i * ANALYSIS_LINE_HEIGHT))
+    display.blit(panel, rect)
+    return rect
+
+def draw(display, board, full=False):
+    """Draws the game board, pushing only the squares that changed to the screen unless full is set.
+
+    With the analysis overlay on, it's drawn over the board and repainted when its lines or the
+    squares under it change.
+    """
+    global analysis_drawn
+    if full:
+        display.fill(WHITE)
+        board.draw(display)
+        if analysis_on:
+            lines, analysis_drawn = analysis_lines()
+            draw_analysis(display, board, lines)
+        pygame.display.update()
+        return
+    changed = board.draw(display, dirty_only=True)
+    if analysis_on:
+        lines, version = analysis_lines()
+        rect = analysis_rect(board)
+        if version != analysis_drawn or any(rect.colliderect(square_rect) for square_rect in changed):
+            # The panel is translucent, so repaint every square under it before drawing it again
+            board.invalidate_rect(rect)
+            changed += board.draw(display, dirty_only=True)
+            changed.append(draw_analysis(display, board, lines))
+            analysis_drawn = version
+    if changed:
+        pygame.display.update(changed)
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+def engine_description(info):
+    """How the AI found a move, for the PGN comment after it."""
+    if info.get("book"):
+        return "book"
+    if info.get("tablebase"):
+        return "tablebase"
+    return f"depth {info['depth']}" if "depth" in info else None
+
+def save_game(board, start_fen, game_mode, move_log, game_result=None):
+    """Appends the game to PGN_PATH, with each move's thinking time (and the AI's search depth)."""
+    if not board.undo_stack:
+        return  # nothing was played
+    if game_result is None:
+        result = "*"
+    elif game_result.startswith("White"):
+        result = "1-0"
+    elif game_result.startswith("Black"):
+        result = "0-1"
+    else:
+        result = "1/2-1/2"
+    headers = {"Event": "Casual game", "Site": "Chess Game", "Date": date.today().strftime("%Y.%m.%d"),
+               "Round": "-", "White": "Player", "Black": "Player"}
+    if game_mode == "ai":
+        headers["Black"] = "Stockfish" if not engine.uses_builtin() else "Built-in engine"
+        if engine.time_mode == "depth":
+            headers["EngineDepth"] = engine.search_depth
+        elif engine.time_mode == "movetime":
+            headers["EngineMovetime"] = engine.move_time
+        else:
+            headers["TimeControl"] = f"{engine.clock_time:g}+{engine.clock_increment:g}"
+        if not engine.uses_builtin() and engine.ENGINE_OPTIONS.get("UCI_LimitStrength"):
+            headers["EngineElo"] = engine.ENGINE_OPTIONS["UCI_Elo"]
+    if game_result:
+        headers["Termination"] = game_result
+    moves = [record[0] for record in board.undo_stack]
+    comments = [f"[%emt {format_duration(spent)}]" + (f" {note}" if note else "") for spent, note in move_log]
+    comments += [None] * (len(moves) - len(comments))  # the last move if the game ended on it
+    try:
+        with open(PGN_PATH, "a") as f:
+            f.write(format_game(headers, start_fen, moves, comments, result))
+        print(f"Game saved to {PGN_PATH}")
+    except OSError as e:
+        print(f"Couldn't save the game: {e}")
 
 def main(game_mode="pvp", preset=None, fen=None):
-    """Main game loop with AI or Player mode selection."""
+    """Main game loop with AI or Player mode selection. Returns the screen to show once the game is left."""
     global paused
     global current_game_mode, current_preset, current_fen
     current_game_mode = game_mode
     current_preset = preset
     current_fen = fen
     paused = False  # Ensure the game starts unpaused
+    cancel_requests()  # drop any search left over from a previous game
+    ai_request = None  # background engine search for the AI's next move
+    ai_request_hash = None  # hash of the position it was asked about
+    ai_gave_up = False  # set if no engine could search
     start_time = time.time()
+    time_used = {"white": 0.0, "black": 0.0}  # game clock: seconds each side has spent on its moves
+    move_log = []  # (seconds spent, AI search note or None) per move on the board, for the PGN
+    ai_note = None  # how the AI found the move it just played
     board = initialise_game()
     last_move = None  # Track the last move for AI
     # inside main()
     if fen:
         board = initialise_game()
         board.set_fen(fen)
-    elif preset == "mid":
-        config = [
-        ["", "", "bR", "bQ", "", "bK", "bR", ""],
-        ["bB", "bP", "", "", "", "bP", "", ""],
-        ["bP", "", "", "bP", "bB", "", "", ""],
-        ["", "", "", "", "", "wN", "", "bP"],
-        ["", "wP", "", "bP", "wB", "", "", "wP"],
-        ["wP", "", "", "", "", "", "wP", ""],
-        ["", "", "wP", "", "wQ", "wP", "", ""],
-        ["", "", "", "wR", "", "wR", "wK", ""],
-        ]
-        board = initialise_game(config=config)
-    elif preset == "end":
-        config = [
-    ["", "", "", "", "", "", "bK", ""],
-    ["", "", "bQ", "", "", "", "", ""],
-    ["", "", "", "", "", "", "", "bP"],
-    ["", "", "", "wP", "wN", "", "", ""],
-    ["", "", "", "", "", "", "", ""],
-    ["", "", "", "", "", "", "", ""],
-    ["wK", "", "", "", "", "wR", "", ""],
-    ["", "", "", "", "", "", "", ""],
-        ]
-        board = initialise_game(config=config)
+    elif preset in ("mid", "end"):
+        board = initialise_game(config=PRESETS[preset])
     else:
         board = initialise_game()
 
-    fen_string = board.get_fen()
+    fen_string = board.get_fen()  # also the PGN's starting position
     pyperclip.copy(fen_string)
     print(f"FEN copied to clipboard: {fen_string}")
-    running = True
-
     # Print selected game mode for debugging
     print(f"Game Mode: {game_mode}")
+    draw(screen, board, full=True)
+    turn, turn_started = board.turn, time.time()
 
-    while running:
-        running = handle_events(board)
-        if not running:
-            main_menu()  # If quitting mid-game, return to main menu
-            break
-
+    while True:
         if paused:
-            pause_menu()  # If paused, enter pause menu before continuing
+            next_scene = pause_menu()  # If paused, enter pause menu before continuing
+            if next_scene:
+                cancel_requests()
+                stop_analysis()
+                save_game(board, fen_string, game_mode, move_log)
+                return next_scene
+
+        now = time.time()
+        if board.turn != turn:  # stop the clock of the side that just moved
+            time_used[turn] += now - turn_started
+            move_log.append((now - turn_started, ai_note))
+            turn, turn_started, ai_note = board.turn, now, None
+        del move_log[len(board.undo_stack):]  # moves taken back
 
         game_result = check_game_status(board)
         if game_result:
-            draw(screen, board)
-            pygame.display.update()
+            stop_analysis()
+            save_game(board, fen_string, game_mode, move_log, game_result)
+            draw(screen, board, full=True)
             final_board_surface = screen.copy()
             elapsed_time = time.time() - start_time
             minutes, seconds = divmod(int(elapsed_time), 60)
             time_str = f"Game Duration: {minutes}m {seconds}s"
-            end_screen(game_result, time_str, final_board_surface, last_move)  # Show end screen with game result
+            return partial(end_screen, game_result, time_str, final_board_surface, last_move)  # Show end screen with game result
 
+        if analysis_on:
+            analyse_position(board)  # restarts the analysis only if the position changed
         draw(screen, board)
 
-        # If AI Mode, add AI move logic
-        if game_mode == "ai" and board.turn == "black":  
-            time.sleep(0.5)
-            best_move = get_best_move(board)
-            if best_move:
+        # If AI Mode, search in the background and play the move once it arrives
+        busy = False
+        if game_mode == "ai" and board.turn == "black":
+            if ai_request is None and not ai_gave_up:
                 try:
-                    start_pos = (ord(best_move[0]) - ord('a'), 8 - int(best_move[1]))
-                    end_pos = (ord(best_move[2]) - ord('a'), 8 - int(best_move[3]))
-                    print(f"AI moving from {start_pos} to {end_pos}")
-                    success = board.move_piece(start_pos, end_pos)
-                    if success:
-                        board.turn = 'white'  # Switch turn to player after AI move
-                        last_move = (start_pos, end_pos)
-                    else:
-                        print("AI move failed")
-                except Exception as e:
-                    print(f"AI Move Error: {e}")  # Debugging message
+                    ai_request = request_best_move(board, time_used["black"] + now - turn_started)
+                    ai_request_hash = board.position.hash
+                    ai_request.add_done_callback(lambda _: frame_clock.wake())  # stop idling once it's found
+                except RuntimeError as e:  # Stockfish couldn't be started
+                    ai_gave_up = not engine.search_failed(e)
+            elif ai_request is not None and ai_request.done():
+                busy = True  # draw and check the result of the move straight away
+                request, ai_request = ai_request, None
+                try:
+                    best_move, info = request.result()
+                except CancelledError:
+                    best_move = None  # paused mid-search, ask again
+                except Exception as e:  # e.g. Stockfish exited; ask again, on the built-in engine if it keeps failing
+                    best_move = None
+                    ai_gave_up = not engine.search_failed(e)
+                if best_move and board.position.hash != ai_request_hash:
+                    best_move = None  # a move was taken back since, ask again for this position
+                if best_move:
+                    try:
+                        start_pos, end_pos, promotion = uci_to_xy(best_move)
+                        print(f"AI moving from {start_pos} to {end_pos}")
+                        success = board.move_piece(start_pos, end_pos, promotion)
+                        if success:
+                            last_move = (start_pos, end_pos)
+                            ai_note = engine_description(info)
+                        else:
+                            print("AI move failed")
+                    except Exception as e:
+                        print(f"AI Move Error: {e}")  # Debugging message
+
+        next_scene = handle_events(board, busy)
+        if next_scene:
+            cancel_requests()  # don't leave the engine searching a game that's gone
+            stop_analysis()
+            save_game(board, fen_string, game_mode, move_log)
+            return next_scene  # e.g. back to the main menu
 
 if __name__ == '__main__':
-    main_menu()  # Start the game with the main menu
\ No newline at end of file
+    engine.tablebase.build()  # generate any missing endgame tables while the menus are up
+    run(main_menu)  # Start the game with the main menu
\ No newline at end of file
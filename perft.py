@@ -0,0 +1,106 @@
+"""Perft: counts the leaf nodes of the legal move tree to check and time the move generator.
+
+Examples:
+    python perft.py --depth 4                        # start position
+    python perft.py --preset mid --depth 3 --divide  # per root move counts, diffable against other engines
+    python perft.py --fen "<fen>" --depth 3
+    python perft.py --suite                          # check the reference positions below
+"""
+import argparse
+import time
+
+from data.classes.Position import Position, START_FEN, move_to_uci
+from presets import preset_fen
+
+# (name, FEN, node counts for depth 1, 2, 3, ...)
+# The standard positions are from the Chess Programming Wiki; the presets were cross-checked
+# against python-chess.
+REFERENCE_POSITIONS = [
+    ("start", START_FEN, [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+    ("mid preset", preset_fen("mid"), [41, 1601, 64284, 2490326]),
+    ("end preset", preset_fen("end"), [27, 617, 12697, 272022]),
+]
+
+
+def perft(position, depth):
+    """Number of leaf nodes `depth` plies below the position."""
+    moves = position.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def divide(position, depth):
+    """Leaf node counts below each root move, as {uci move: nodes}."""
+    counts = {}
+    for move in position.legal_moves():
+        position.make_move(move)
+        counts[move_to_uci(move)] = perft(position, depth - 1)
+        position.unmake_move()
+    return counts
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run_suite(max_nodes):
+    """Runs every reference position to the deepest depth within max_nodes; returns True if all match."""
+    all_ok = True
+    print(f"{'position':<12}{'depth':>6}{'nodes':>12}{'expected':>12}{'nps':>12}")
+    for name, fen, counts in REFERENCE_POSITIONS:
+        depth = max(d for d, count in enumerate(counts, 1) if count <= max_nodes or d == 1)
+        nodes, elapsed = timed(perft, Position.from_fen(fen), depth)
+        ok = nodes == counts[depth - 1]
+        all_ok &= ok
+        print(f"{name:<12}{depth:>6}{nodes:>12}{counts[depth - 1]:>12}{nodes / elapsed:>12.0f}"
+              f"  {'ok' if ok else 'MISMATCH'}")
+    return all_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count move-tree leaf nodes to check and benchmark move generation.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--fen", help="position to search (default: start position)")
+    source.add_argument("--preset", choices=["start", "mid", "end"], help="one of the game presets")
+    source.add_argument("--suite", action="store_true", help="check all reference positions")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move")
+    parser.add_argument("--max-nodes", type=int, default=1000000,
+                        help="with --suite, search each position as deep as this node budget allows")
+    args = parser.parse_args()
+
+    if args.suite:
+        raise SystemExit(0 if run_suite(args.max_nodes) else 1)
+
+    fen = args.fen or preset_fen(args.preset or "start")
+    position = Position.from_fen(fen)
+    if args.divide:
+        counts, elapsed = timed(divide, position, args.depth)
+        for move in sorted(counts):
+            print(f"{move}: {counts[move]}")
+        nodes = sum(counts.values())
+        print(f"\nMoves: {len(counts)}")
+    else:
+        nodes, elapsed = timed(perft, position, args.depth)
+    print(f"Nodes: {nodes}")
+    print(f"Time: {elapsed:.3f}s ({nodes / elapsed:.0f} nodes/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Replays every game of one or more PGN files through the position core and prints statistics.
+
+Games are read and replayed one at a time, so memory stays flat however big the files are. With
+--fens, the positions reached are also written out one FEN per line, ready for depth_sweep.py
+--fen-file or analyze.py. Duplicates are skipped among the last --dedupe-window distinct positions
+written, so that stays bounded too; a position seen again after it has dropped out is written twice.
+
+Examples:
+    python pgn_replay.py games.pgn
+    python pgn_replay.py lichess_2024.pgn --limit 10000 --fens positions.fen --min-ply 10 --every 4
+"""
+import argparse
+import sys
+import time
+from collections import Counter, OrderedDict
+
+from data.classes.Pgn import read_games
+from data.classes.Position import Position
+
+
+DEDUPE_WINDOW = 1000000  # distinct positions remembered for --fens deduplication (about 140 MB)
+
+
+def seen_recently(seen, key, window):
+    """Whether key is among the last `window` distinct keys added to the OrderedDict seen; adds it if not."""
+    if key in seen:
+        seen.move_to_end(key)
+        return True
+    seen[key] = None
+    if len(seen) > window:
+        seen.popitem(last=False)
+    return False
+
+
+def replay_file(path, position, stats, fens=None, seen=None, min_ply=0, every=1, limit=None, window=DEDUPE_WINDOW):
+    """Replays the games in one file into position, counting into stats. Returns False once limit is reached."""
+    with open(path, encoding='utf-8', errors='replace') as stream:
+        for game in read_games(stream):
+            if limit is not None and stats['games'] >= limit:
+                return False
+            stats['games'] += 1
+            try:
+                for ply, (current, move) in enumerate(game.replay(position)):
+                    stats['plies'] += 1
+                    if (fens is not None and ply >= min_ply and (ply - min_ply) % every == 0
+                            and not seen_recently(seen, current.hash, window)):
+                        stats['fens'] += 1
+                        fens.write(current.fen() + '\n')
+            except ValueError as e:
+                stats['errors'] += 1
+                print(f"{path}: game {stats['games']} ({game.headers.get('White', '?')} - "
+                      f"{game.headers.get('Black', '?')}): {e}", file=sys.stderr)
+                continue
+            stats['results'][game.result] += 1
+            if stats['games'] % 1000 == 0:
+                print(f"{stats['games']} games...", file=sys.stderr)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay PGN games through the position core and collect statistics.")
+    parser.add_argument("pgn", nargs="+", help="PGN files")
+    parser.add_argument("--limit", type=int, help="stop after this many games")
+    parser.add_argument("--fens", help="write the positions reached to this file, one FEN per line")
+    parser.add_argument("--min-ply", type=int, default=0, help="with --fens, skip the first plies of each game")
+    parser.add_argument("--every", type=int, default=1, help="with --fens, keep every Nth position of each game")
+    parser.add_argument("--dedupe-window", type=int, default=DEDUPE_WINDOW,
+                        help="with --fens, skip positions among this many recently written ones (memory grows with it)")
+    args = parser.parse_args()
+
+    stats = {'games': 0, 'plies': 0, 'errors': 0, 'fens': 0, 'results': Counter()}
+    position = Position()
+    seen = OrderedDict()  # Zobrist hashes of recently written positions, oldest first
+    fens = open(args.fens, 'w') if args.fens else None
+    started = time.perf_counter()
+    try:
+        for path in args.pgn:
+            if not replay_file(path, position, stats, fens, seen, args.min_ply, args.every, args.limit,
+                               args.dedupe_window):
+                break
+    finally:
+        if fens:
+            fens.close()
+    elapsed = time.perf_counter() - started
+
+    games = stats['games']
+    print(f"Games: {games} ({stats['errors']} with errors)")
+    print(f"Plies: {stats['plies']} ({stats['plies'] / max(games, 1):.1f} per game)")
+    print("Results: " + ", ".join(f"{result} {count}" for result, count in stats['results'].most_common()))
+    print(f"Time: {elapsed:.2f}s ({games / elapsed:.0f} games/s, {stats['plies'] / elapsed:.0f} plies/s)")
+    if fens:
+        print(f"Wrote {stats['fens']} positions to {args.fens}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""Board layouts for the Startgame, Midgame and Endgame presets."""
+
+MID_GAME = [
+    ["", "", "bR", "bQ", "", "bK", "bR", ""],
+    ["bB", "bP", "", "", "", "bP", "", ""],
+    ["bP", "", "", "bP", "bB", "", "", ""],
+    ["", "", "", "", "", "wN", "", "bP"],
+    ["", "wP", "", "bP", "wB", "", "", "wP"],
+    ["wP", "", "", "", "", "", "wP", ""],
+    ["", "", "wP", "", "wQ", "wP", "", ""],
+    ["", "", "", "wR", "", "wR", "wK", ""],
+]
+
+END_GAME = [
+    ["", "", "", "", "", "", "bK", ""],
+    ["", "", "bQ", "", "", "", "", ""],
+    ["", "", "", "", "", "", "", "bP"],
+    ["", "", "", "wP", "wN", "", "", ""],
+    ["", "", "", "", "", "", "", ""],
+    ["", "", "", "", "", "", "", ""],
+    ["wK", "", "", "", "", "wR", "", ""],
+    ["", "", "", "", "", "", "", ""],
+]
+
+# None means the Board's default starting layout
+PRESETS = {
+    "start": None,
+    "mid": MID_GAME,
+    "end": END_GAME,
+}
+
+
+def preset_fen(name):
+    """FEN of a preset, with white to move and castling wherever kings and rooks are unmoved."""
+    from data.classes.Position import Position, START_FEN
+    rows = PRESETS[name]
+    return START_FEN if rows is None else Position.from_rows(rows).fen()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+
+@pytest.fixture
+def fake_engine_path(tmp_path):
+    """A launcher for tests/fake_uci.py that UciEngine can start like an engine binary."""
+    script = os.path.join(TESTS_DIR, 'fake_uci.py')
+    if os.name == 'nt':
+        launcher = tmp_path / 'fake_uci.bat'
+        launcher.write_text(f'@"{sys.executable}" "{script}" %*\n')
+    else:
+        launcher = tmp_path / 'fake_uci'
+        launcher.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        launcher.chmod(0o755)
+    return str(launcher)
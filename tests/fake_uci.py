@@ -0,0 +1,85 @@
+"""A scripted stand-in for a UCI engine, for testing the engine pool without Stockfish.
+
+It speaks just enough UCI for UciEngine: 'go' 'searches' one depth every 20 ms, reporting an info
+line each time, and answers with the first legal move. 'go infinite' runs until 'stop'.
+Setting the FakeScore option makes every info line report that score in centipawns.
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.classes.Position import Position, move_to_uci
+
+DEPTH_TIME = 0.02  # seconds per depth
+
+
+class FakeEngine:
+    def __init__(self):
+        self.position = Position()
+        self.options = {}
+        self.stopped = threading.Event()
+        self.worker = None
+        self.write_lock = threading.Lock()
+
+    def send(self, line):
+        with self.write_lock:
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+
+    def search(self, depth, movetime):
+        moves = self.position.legal_moves()
+        best = move_to_uci(moves[0]) if moves else None
+        started = time.perf_counter()
+        for d in range(1, depth + 1):
+            if self.stopped.is_set() or movetime is not None and time.perf_counter() - started > movetime / 1000:
+                break
+            time.sleep(DEPTH_TIME)
+            score = int(self.options.get('FakeScore', d * 3))
+            elapsed = int((time.perf_counter() - started) * 1000)
+            self.send(f"info depth {d} seldepth {d} multipv 1 score cp {score} nodes {d * 1000} "
+                      f"nps 50000 time {elapsed} pv {best or ''}".rstrip())
+        self.send(f"bestmove {best or '(none)'}")
+
+    def finish_search(self):
+        if self.worker is not None:
+            self.stopped.set()
+            self.worker.join()
+            self.worker = None
+
+    def go(self, tokens):
+        depth = int(tokens[tokens.index('depth') + 1]) if 'depth' in tokens else 10 ** 6
+        movetime = int(tokens[tokens.index('movetime') + 1]) if 'movetime' in tokens else None
+        self.stopped.clear()
+        self.worker = threading.Thread(target=self.search, args=(depth, movetime))
+        self.worker.start()
+
+    def run(self):
+        for line in sys.stdin:
+            tokens = line.split()
+            if not tokens:
+                continue
+            command = tokens[0]
+            if command == 'uci':
+                self.send('id name FakeUci')
+                self.send('uciok')
+            elif command == 'isready':
+                self.send('readyok')
+            elif command == 'setoption':
+                name = ' '.join(tokens[2:tokens.index('value')])
+                self.options[name] = ' '.join(tokens[tokens.index('value') + 1:])
+            elif command == 'position' and tokens[1] == 'fen':
+                self.position = Position.from_fen(' '.join(tokens[2:8]))
+            elif command == 'go':
+                self.go(tokens)
+            elif command == 'stop':
+                self.finish_search()
+            elif command == 'quit':
+                break
+        self.finish_search()
+
+
+if __name__ == '__main__':
+    FakeEngine().run()
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from data.classes.EnginePool import EnginePool
+from data.classes.Position import START_FEN, Position
+
+TIMEOUT = 10  # seconds to wait for any one result
+
+
+@pytest.fixture
+def pool(fake_engine_path):
+    pool = EnginePool(fake_engine_path, size=2)
+    yield pool
+    pool.shutdown()
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_submit_returns_the_best_move_and_last_info(pool):
+    future = pool.submit(START_FEN, depth=3)
+    best_move, info = future.result(timeout=TIMEOUT)
+    assert Position.from_fen(START_FEN).parse_uci(best_move) is not None
+    assert info['depth'] == 3
+    assert info['score'] == ('cp', 9)
+    assert info['pv'] == [best_move]
+
+
+def test_submit_does_not_block(pool):
+    started = time.perf_counter()
+    future = pool.submit(START_FEN)  # infinite
+    assert time.perf_counter() - started < 0.5
+    assert not future.done()
+    pool.cancel(future)
+    with pytest.raises(CancelledError):
+        future.result(timeout=TIMEOUT)
+
+
+def test_on_info_sees_every_depth(pool):
+    depths = []
+    pool.submit(START_FEN, depth=4, on_info=lambda info: depths.append(info['depth'])).result(timeout=TIMEOUT)
+    assert depths == [1, 2, 3, 4]
+
+
+def test_pool_runs_at_most_size_searches_at_once(pool):
+    futures = [pool.submit(START_FEN) for _ in range(3)]
+    wait_until(lambda: len(pool.running) == 2)
+    time.sleep(0.1)
+    assert len(pool.running) == 2
+    assert pool.idle.empty()
+    assert sum(future.running() for future in futures) == 2
+    assert not futures[2].running()  # queued until an engine is free
+    pool.cancel_all()
+
+
+def test_queued_request_runs_once_an_engine_is_free(pool):
+    blockers = [pool.submit(START_FEN) for _ in range(2)]
+    queued = pool.submit(START_FEN, depth=2)
+    wait_until(lambda: len(pool.running) == 2)
+    pool.cancel(blockers[0])
+    best_move, info = queued.result(timeout=TIMEOUT)
+    assert info['depth'] == 2
+    pool.cancel(blockers[1])
+
+
+def test_cancel_all_stops_running_and_queued_searches(pool):
+    futures = [pool.submit(START_FEN) for _ in range(4)]
+    wait_until(lambda: len(pool.running) == 2)
+    pool.cancel_all()
+    for future in futures:
+        with pytest.raises(CancelledError):
+            future.result(timeout=TIMEOUT)
+    assert not pool.pending
+    # Both engines are free again
+    assert pool.submit(START_FEN, depth=1).result(timeout=TIMEOUT)[1]['depth'] == 1
+    assert pool.idle.qsize() == 2
+
+
+def test_configure_sets_options_on_every_engine(pool):
+    pool.configure({'FakeScore': 42})
+    assert pool.options == {'FakeScore': 42}
+    scores = [pool.submit(START_FEN, depth=1).result(timeout=TIMEOUT)[1]['score'] for _ in range(4)]
+    assert scores == [('cp', 42)] * 4
+
+
+def test_configure_waits_for_running_searches(pool):
+    future = pool.submit(START_FEN, depth=10)
+    wait_until(lambda: len(pool.running) == 1)
+    pool.configure({'FakeScore': 7})
+    assert future.result(timeout=TIMEOUT)[1]['depth'] == 10  # finished, not stopped
+
+
+def test_engine_that_died_is_restarted(pool):
+    dead = pool.engines[0]
+    dead.process.kill()
+    dead.process.wait()
+    results = [pool.submit(START_FEN, depth=1) for _ in range(4)]
+    errors = [future.exception(timeout=TIMEOUT) for future in results]
+    assert sum(isinstance(error, (RuntimeError, OSError)) for error in errors) == 1
+    assert dead not in pool.engines
+    assert all(engine.process.poll() is None for engine in pool.engines)
+    for _ in range(4):
+        assert pool.submit(START_FEN, depth=1).result(timeout=TIMEOUT)[1]['depth'] == 1
+
+
+def test_restarted_engine_keeps_the_pool_options(pool):
+    pool.configure({'FakeScore': 5})
+    pool.engines[1].process.kill()
+    pool.engines[1].process.wait()
+    for _ in range(4):
+        pool.submit(START_FEN, depth=1).exception(timeout=TIMEOUT)
+    scores = [pool.submit(START_FEN, depth=1).result(timeout=TIMEOUT)[1]['score'] for _ in range(4)]
+    assert scores == [('cp', 5)] * 4
@@ -0,0 +1,60 @@
+import re
+
+import pytest
+
+from data.classes.Position import Position, START_FEN, WHITE, BLACK
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+@pytest.mark.parametrize("fen", [
+    START_FEN,
+    KIWIPETE,
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+    "8/8/8/4k3/8/8/8/4K2Q b - - 12 60",
+])
+def test_fen_round_trip(fen):
+    assert Position.from_fen(fen).fen() == fen
+
+
+def test_set_fen_loads_in_place():
+    position = Position.from_fen(START_FEN)
+    position.set_fen(KIWIPETE)
+    assert position.fen() == KIWIPETE
+    assert position.hash == Position.from_fen(KIWIPETE).hash
+    assert len(position.legal_moves()) == 48
+
+
+@pytest.mark.parametrize("fen, message", [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -", "6 fields"),
+    ("rnbqkbnr/pppppppp/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", "8 ranks"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1", "Unknown piece 'X'"),
+    ("rnbqkbnr/pppppppp/7/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", "Rank 6 ('7') covers 7 files"),
+    ("rnbqkbnr/pppppppp/45/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", "Rank 6 ('45') covers 9 files"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQ1BNR w kq - 0 1", "White needs exactly one king"),
+    ("Pnbqkbnr/1ppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", "Pawn on rank 8"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1", "Side to move"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkqK - 0 1", "Bad castling field"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkx - 0 1", "Bad castling field"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN1 w KQkq - 0 1", "Castling right 'K' needs a king on e1 and a rook on h1"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e9 0 1", "Bad en passant square"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e3 0 1", "must be on rank 6"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - x 1", "Halfmove clock"),
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 0", "Fullmove number"),
+    ("4k3/8/8/8/8/8/8/4R2K w - - 0 1", "The side not to move (black) is in check"),
+    ("4k3/8/8/8/8/8/8/r3K3 b - - 0 1", "The side not to move (white) is in check"),
+])
+def test_set_fen_rejects_bad_fields(fen, message):
+    position = Position.from_fen(KIWIPETE)
+    with pytest.raises(ValueError, match=re.escape(message)):
+        position.set_fen(fen)
+    # A rejected FEN leaves the position as it was
+    assert position.fen() == KIWIPETE
+    assert position.hash == Position.from_fen(KIWIPETE).hash
+
+
+def test_side_to_move_may_be_in_check():
+    position = Position.from_fen("4k3/8/8/8/8/8/8/4R2K b - - 0 1")
+    assert position.in_check(BLACK)
+    assert not position.in_check(WHITE)
+    assert position.king_squares == [63, 4]
@@ -0,0 +1,140 @@
+from concurrent.futures import Future
+
+import pytest
+
+import engine
+from data.classes.MoveCache import MoveCache
+from data.classes.Position import Position, START_FEN
+
+INFO = {"depth": 12, "score": ("cp", 31), "pv": ["e2e4", "e7e5"]}
+
+
+def test_key_ignores_move_counters_and_option_order():
+    key = MoveCache.make_key(START_FEN, 10, {"Hash": 256, "Threads": 2})
+    assert key == MoveCache.make_key(START_FEN.replace(" 0 1", " 7 30"), 10, {"Threads": 2, "Hash": 256})
+    assert key != MoveCache.make_key(START_FEN, 11, {"Hash": 256, "Threads": 2})
+    assert key != MoveCache.make_key(START_FEN, 10, {"Hash": 128, "Threads": 2})
+
+
+def test_get_and_put_count_hits_and_misses():
+    cache = MoveCache()
+    assert cache.get("a") is None
+    cache.put("a", "e2e4", INFO)
+    assert cache.get("a") == ("e2e4", INFO)
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = MoveCache(max_size=2)
+    cache.put("a", "a2a3")
+    cache.put("b", "b2b3")
+    cache.get("a")  # now b is the oldest
+    cache.put("c", "c2c3")
+    assert cache.get("b") is None
+    assert cache.get("a") == ("a2a3", {})
+    assert cache.get("c") == ("c2c3", {})
+    assert cache.stats()["size"] == 2
+
+
+def test_sqlite_file_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = MoveCache(path=path)
+    cache.put("a", "e2e4", INFO)
+    cache.put("a", "d2d4", INFO)  # replaces the first
+    cache.close()
+
+    reopened = MoveCache(max_size=1, path=path)
+    best_move, info = reopened.get("a")
+    assert best_move == "d2d4"
+    assert info == INFO
+    assert isinstance(info["score"], tuple)  # JSON turns it into a list
+    assert reopened.get("b") is None
+    reopened.close()
+
+
+def test_sqlite_keeps_entries_evicted_from_memory(tmp_path):
+    cache = MoveCache(max_size=1, path=str(tmp_path / "cache.sqlite3"))
+    cache.put("a", "a2a3")
+    cache.put("b", "b2b3")
+    assert "a" not in cache.entries
+    assert cache.get("a") == ("a2a3", {})
+    cache.close()
+
+
+class StubBoard:
+    """The parts of Board request_best_move reads."""
+    def __init__(self, fen=START_FEN):
+        self.position = Position.from_fen(fen)
+        self.fullmove_number = self.position.fullmove_number
+
+    def get_fen(self):
+        return self.position.fen()
+
+
+class StubPool:
+    """Answers every search at once with a fixed result."""
+    def __init__(self, result):
+        self.result = result
+        self.searches = 0
+
+    def submit(self, fen, depth=None, movetime=None, on_info=None):
+        self.searches += 1
+        future = Future()
+        future.set_result(self.result)
+        return future
+
+
+@pytest.fixture
+def stub_engine(monkeypatch):
+    """engine.py on the built-in engine with an empty cache, no book or tablebase, and a StubPool."""
+    monkeypatch.setattr(engine, "move_cache", MoveCache())
+    monkeypatch.setattr(engine, "_engine_path", "builtin")
+    monkeypatch.setattr(engine, "book_move", lambda board: None)
+    monkeypatch.setattr(engine, "tablebase_move", lambda board: None)
+    monkeypatch.setattr(engine, "time_mode", "depth")
+    monkeypatch.setattr(engine, "search_depth", 6)
+
+    def use_pool(result):
+        pool = StubPool(result)
+        monkeypatch.setattr(engine, "_pool", pool)
+        return pool
+    return use_pool
+
+
+def test_depth_search_is_cached(stub_engine):
+    pool = stub_engine(("e2e4", {"depth": 6, "score": ("cp", 20)}))
+    assert engine.request_best_move(StubBoard()).result()[0] == "e2e4"
+    assert engine.request_best_move(StubBoard()).result()[0] == "e2e4"
+    assert pool.searches == 1
+
+
+def test_search_cut_off_before_its_depth_is_not_cached(stub_engine):
+    pool = stub_engine(("e2e4", {"depth": 4, "score": ("cp", 20)}))  # BUILTIN_MAX_TIME ran out
+    engine.request_best_move(StubBoard())
+    engine.request_best_move(StubBoard())
+    assert pool.searches == 2
+
+
+def test_early_mate_is_cached(stub_engine):
+    fen = "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+    pool = stub_engine(("a1a8", {"depth": 1, "score": ("mate", 1)}))
+    engine.request_best_move(StubBoard(fen))
+    assert engine.request_best_move(StubBoard(fen)).result()[0] == "a1a8"
+    assert pool.searches == 1
+
+
+def test_time_limited_searches_are_not_cached(stub_engine, monkeypatch):
+    monkeypatch.setattr(engine, "time_mode", "movetime")
+    pool = stub_engine(("e2e4", {"depth": 9, "score": ("cp", 20)}))
+    engine.request_best_move(StubBoard())
+    engine.request_best_move(StubBoard())
+    assert pool.searches == 2
+    assert engine.move_cache.stats()["size"] == 0
+
+
+def test_builtin_time_limit_is_part_of_the_key(stub_engine, monkeypatch):
+    pool = stub_engine(("e2e4", {"depth": 6, "score": ("cp", 20)}))
+    engine.request_best_move(StubBoard())
+    monkeypatch.setattr(engine, "BUILTIN_MAX_TIME", engine.BUILTIN_MAX_TIME * 2)
+    engine.request_best_move(StubBoard())
+    assert pool.searches == 2
@@ -0,0 +1,120 @@
+import pytest
+
+from data.classes.Notation import (move_to_san, move_to_xy, san_to_move, san_to_uci, square_name, uci_to_san,
+                                   uci_to_xy, xy_to_move, xy_to_uci)
+from data.classes.Position import Position, START_FEN, move_to_uci, uci_to_move
+
+# A short game with captures, checks, disambiguation, a promotion and castling
+GAME = ['e2e4', 'd7d5', 'e4d5', 'g8f6', 'f1b5', 'c7c6', 'd5c6', 'd8d2', 'b1d2', 'e8d8', 'c6b7', 'a7a6',
+        'b7a8q', 'b8d7', 'g1f3', 'a6b5', 'e1g1']
+GAME_SAN = ['e4', 'd5', 'exd5', 'Nf6', 'Bb5+', 'c6', 'dxc6', 'Qxd2+', 'Nxd2', 'Kd8', 'cxb7', 'a6',
+            'bxa8=Q', 'Nbd7', 'Ngf3', 'axb5', 'O-O']
+
+
+def test_san_round_trip_over_a_game():
+    position = Position.from_fen(START_FEN)
+    for uci, san in zip(GAME, GAME_SAN):
+        move = position.parse_uci(uci)
+        assert move_to_san(position, move) == san
+        assert san_to_move(position, san) == move
+        position.make_move(move)
+
+
+def test_every_legal_move_matches_python_chess():
+    chess = pytest.importorskip("chess")
+    position = Position.from_fen(START_FEN)
+    reference = chess.Board()
+    for uci in GAME:
+        for move in position.legal_moves():
+            san = reference.san(chess.Move.from_uci(move_to_uci(move)))
+            assert move_to_san(position, move) == san
+            assert san_to_move(position, san) == move
+        position.make_move(position.parse_uci(uci))
+        reference.push_uci(uci)
+
+
+@pytest.mark.parametrize("fen, uci, san", [
+    ("4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1", "e1g1", "O-O"),
+    ("4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1", "e1c1", "O-O-O"),
+    ("1k6/8/8/8/8/8/8/R3K2R w KQ - 0 1", "e1c1", "O-O-O"),  # not check: the rook lands on d1
+    ("3k4/8/8/8/8/8/8/R3K2R w KQ - 0 1", "e1c1", "O-O-O+"),
+    ("4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1", "a1a8", "Ra8+"),
+    ("7k/8/6K1/8/8/8/8/R7 w - - 0 1", "a1a8", "Ra8#"),
+    ("4k3/8/8/8/8/8/8/R4RK1 w - - 0 1", "a1d1", "Rad1"),  # file
+    ("4k3/R7/8/8/8/8/8/R5K1 w - - 0 1", "a1a4", "R1a4"),  # rank
+    ("2k5/8/8/8/Q6Q/8/8/Q5K1 w - - 0 1", "a1d4", "Q1d4"),
+    ("2k5/8/8/8/Q6Q/8/8/Q5K1 w - - 0 1", "a4d4", "Qa4d4"),  # neither file nor rank alone is enough
+    ("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "b7b8q", "b8=Q+"),
+    ("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "b7b8n", "b8=N"),
+    ("2r1k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "b7c8r", "bxc8=R+"),
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 2", "e5d6", "exd6"),
+])
+def test_san_of_special_moves(fen, uci, san):
+    position = Position.from_fen(fen)
+    move = position.parse_uci(uci)
+    assert move_to_san(position, move) == san
+    assert san_to_move(position, san) == move
+    assert uci_to_san(position, uci) == san
+    assert san_to_uci(position, san) == uci
+    assert position.fen() == fen  # looking for check leaves the position as it was
+
+
+@pytest.mark.parametrize("san, uci", [
+    ("b8Q", "b7b8q"),  # promotion without the '='
+    ("b8=Q+", "b7b8q"),
+    ("b8=Q!?", "b7b8q"),
+    ("Kxe2", "e1e2"),
+])
+def test_lenient_san(san, uci):
+    assert san_to_uci(Position.from_fen("4k3/1P6/8/8/8/8/4p3/4K3 w - - 0 1"), san) == uci
+
+
+@pytest.mark.parametrize("san", [
+    "R4a4",  # no rook on the 4th rank
+    "Ra4",  # ambiguous between a1 and a7
+    "Ke2x",  # not a square
+    "O-O",  # no castling rights
+    "b8=K",  # not a promotion piece
+    "Qd4",  # no queen
+    "",
+])
+def test_bad_san_gives_none(san):
+    assert san_to_move(Position.from_fen("4k3/RP6/8/8/8/8/8/R5K1 w - - 0 1"), san) is None
+
+
+def test_uci_of_an_illegal_move_gives_no_san():
+    position = Position.from_fen(START_FEN)
+    assert uci_to_san(position, "e2e5") is None
+    assert san_to_uci(position, "e5") is None
+
+
+@pytest.mark.parametrize("uci, xy", [
+    ("e2e4", ((4, 6), (4, 4), None)),
+    ("a8h1", ((0, 0), (7, 7), None)),
+    ("e7e8q", ((4, 1), (4, 0), 'Q')),
+    ("h2h1n", ((7, 6), (7, 7), 'N')),
+])
+def test_uci_and_board_coordinates(uci, xy):
+    assert uci_to_xy(uci) == xy
+    assert xy_to_uci(*xy) == uci
+    move = uci_to_move(uci)
+    assert move_to_uci(move) == uci
+    assert move_to_xy(move) == xy
+    assert xy_to_move(*xy) == move
+
+
+def test_lowercase_promotion_letter():
+    assert xy_to_uci((4, 1), (4, 0), 'q') == "e7e8q"
+
+
+@pytest.mark.parametrize("uci", ["e2", "e2e9", "i2i4", "e7e8k", "e7e8qq", ""])
+def test_malformed_uci(uci):
+    assert uci_to_move(uci) is None
+    with pytest.raises(ValueError, match="Not a UCI move"):
+        uci_to_xy(uci)
+
+
+def test_square_name():
+    assert square_name(0, 0) == "a8"
+    assert square_name(4, 4) == "e4"
+    assert square_name(7, 7) == "h1"
@@ -0,0 +1,137 @@
+import io
+
+import pytest
+
+from data.classes.Notation import move_to_san
+from data.classes.Pgn import format_game, parse_movetext, read_games
+from data.classes.Position import Position, START_FEN
+
+# Scholar's mate plus a few moves around it, in UCI
+SCHOLARS_MATE = ['e2e4', 'e7e5', 'f1c4', 'b8c6', 'd1h5', 'g8f6', 'h5f7']
+# Castling both ways and en passant
+TRICKY = ['e2e4', 'd7d5', 'e4e5', 'f7f5', 'e5f6', 'g8f6', 'g1f3', 'e7e6', 'f1e2', 'f8e7', 'e1g1', 'b8c6',
+          'd2d3', 'd8d6', 'b1c3', 'c8d7', 'c1e3', 'e8c8']
+
+
+def packed(ucis, fen=START_FEN):
+    position = Position.from_fen(fen)
+    moves = []
+    for uci in ucis:
+        move = position.parse_uci(uci)
+        assert move is not None, uci
+        moves.append(move)
+        position.make_move(move)
+    return moves
+
+
+def headers():
+    # The tags main.save_game writes for a game against the AI
+    return {"Event": "Casual game", "Site": "Chess Game", "Date": "2026.10.18", "Round": "-",
+            "White": "Player", "Black": "Stockfish", "EngineDepth": 10, "Termination": "White Wins!"}
+
+
+def test_written_game_reads_back():
+    moves = packed(SCHOLARS_MATE)
+    comments = ["[%emt 0:00:03]", "[%emt 0:00:01] depth 10", None, None, "[%emt 0:01:10]", None, None]
+    text = format_game(headers(), START_FEN, moves, comments, "1-0")
+
+    [game] = list(read_games(io.StringIO(text)))
+    assert game.result == "1-0"
+    assert game.headers["Black"] == "Stockfish"
+    assert game.headers["EngineDepth"] == "10"
+    assert game.moves == ['e4', 'e5', 'Bc4', 'Nc6', 'Qh5', 'Nf6', 'Qxf7#']
+    assert game.comments == comments
+    replayed = [move for _, move in game.replay()]
+    assert replayed == moves
+
+
+def test_tricky_moves_round_trip():
+    moves = packed(TRICKY)
+    text = format_game(headers(), START_FEN, moves)
+    [game] = list(read_games(io.StringIO(text)))
+    assert 'O-O' in game.moves and 'O-O-O' in game.moves
+    assert 'exf6' in game.moves  # en passant
+    assert [move for _, move in game.replay()] == moves
+
+
+def test_game_from_a_fen_round_trips():
+    fen = "4k3/8/8/8/8/8/1p6/R3K3 b Q - 3 40"
+    moves = packed(['b2a1n', 'e1e2', 'a1c2'], fen)  # an underpromotion that takes the rook
+    text = format_game({"Event": "Preset"}, fen, moves, result="*")
+    assert '[SetUp "1"]' in text and f'[FEN "{fen}"]' in text
+    assert "40... bxa1=N 41. Ke2 Nc2 *" in text
+    [game] = list(read_games(io.StringIO(text)))
+    assert game.start_fen == fen
+    assert [move for _, move in game.replay()] == moves
+
+
+def test_lines_are_wrapped_at_80_columns():
+    moves = packed(TRICKY)
+    comments = ["[%emt 0:00:05] depth 12, 1500 Elo"] * len(moves)
+    text = format_game(headers(), START_FEN, moves, comments)
+    assert max(len(line) for line in text.splitlines()) <= 80
+
+
+def test_tag_values_are_escaped():
+    moves = packed(['e2e4'])
+    text = format_game({"Event": 'The "big" one \\ final'}, START_FEN, moves)
+    [game] = list(read_games(io.StringIO(text)))
+    assert game.headers["Event"] == 'The "big" one \\ final'
+
+
+def test_several_games_stream_one_at_a_time():
+    texts = [format_game({"Round": str(round_number)}, START_FEN, packed(SCHOLARS_MATE[:round_number]))
+             for round_number in range(1, 6)]
+    games = read_games(io.StringIO(''.join(texts)))
+    for round_number, game in enumerate(games, 1):
+        assert game.headers["Round"] == str(round_number)
+        assert len(game.moves) == round_number
+
+
+def test_variations_nags_and_comments_are_skipped():
+    moves, comments, result = parse_movetext(
+        "1. e4 $1 {best by test} e5 (1... c5 2. Nf3 (2. c3) d6) 2. Nf3 ; a line comment\n"
+        "Nc6 {a comment\nover two lines} 1/2-1/2")
+    assert moves == ['e4', 'e5', 'Nf3', 'Nc6']
+    assert comments == ['best by test', None, 'a line comment', 'a comment\nover two lines']
+    assert result == '1/2-1/2'
+
+
+def test_tags_after_a_multiline_comment_start_the_next_game():
+    text = '[Event "one"]\n\n1. e4 {open\n[not a tag]} e5 *\n\n[Event "two"]\n\n1. d4 *\n'
+    games = list(read_games(io.StringIO(text)))
+    assert [game.headers["Event"] for game in games] == ["one", "two"]
+    assert games[0].moves == ['e4', 'e5']
+
+
+def test_illegal_move_raises_with_its_ply():
+    [game] = list(read_games(io.StringIO('[Event "bad"]\n\n1. e4 e5 2. Ke3 *\n')))
+    with pytest.raises(ValueError, match="'Ke3' at ply 3"):
+        list(game.replay())
+
+
+def test_replay_reuses_a_position():
+    position = Position()
+    [game] = list(read_games(io.StringIO(format_game({}, START_FEN, packed(SCHOLARS_MATE)))))
+    for current, move in game.replay(position):
+        assert current is position
+        assert move_to_san(current, move) in game.moves
+    assert position.is_checkmate()
+
+
+def test_fen_dedupe_window_is_bounded(tmp_path):
+    from collections import Counter, OrderedDict
+    from pgn_replay import replay_file, seen_recently
+
+    seen = OrderedDict()
+    assert [seen_recently(seen, key, 2) for key in [1, 2, 1, 3, 2, 1]] == [False, False, True, False, False, False]
+    assert list(seen) == [2, 1]  # 1 was pushed out by 3 and 2 before it came back
+
+    path = tmp_path / "games.pgn"
+    path.write_text(format_game({}, START_FEN, packed(SCHOLARS_MATE)) * 3)
+    for window, written in [(1000, len(SCHOLARS_MATE)), (3, 3 * len(SCHOLARS_MATE))]:
+        stats = {'games': 0, 'plies': 0, 'errors': 0, 'fens': 0, 'results': Counter()}
+        fens = io.StringIO()
+        replay_file(str(path), Position(), stats, fens, OrderedDict(), window=window)
+        assert stats['games'] == 3
+        assert stats['fens'] == written == len(fens.getvalue().splitlines())
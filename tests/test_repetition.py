@@ -0,0 +1,73 @@
+from data.classes.Position import Position, START_FEN
+
+KNIGHT_SHUFFLE = ['g1f3', 'g8f6', 'f3g1', 'f6g8']  # back to the start after every 4 plies
+
+
+def play(position, ucis):
+    for uci in ucis:
+        move = position.parse_uci(uci)
+        assert move is not None, uci
+        position.make_move(move)
+
+
+def test_hash_is_restored_by_unmake():
+    position = Position.from_fen(START_FEN)
+    start_hash = position.hash
+    play(position, ['e2e4', 'd7d5', 'e4d5', 'g8f6', 'f1b5', 'c7c6', 'd5c6', 'd8d2', 'b1d2', 'e8d8', 'c6b7', 'a7a6'])
+    play(position, ['b7a8q'])
+    for _ in range(13):
+        position.unmake_move()
+    assert position.hash == start_hash
+    assert position.fen() == START_FEN
+
+
+def test_hash_matches_a_fresh_load_of_the_same_position():
+    position = Position.from_fen(START_FEN)
+    play(position, ['e2e4', 'c7c5', 'e4e5', 'd7d5'])  # d6 can be taken en passant
+    assert position.hash == Position.from_fen(position.fen()).hash
+    play(position, ['e1e2'])  # loses the castling rights and the en passant chance
+    assert position.hash == Position.from_fen(position.fen()).hash
+
+
+def test_transposition_has_the_same_hash():
+    first = Position.from_fen(START_FEN)
+    play(first, ['g1f3', 'g8f6', 'b1c3'])
+    second = Position.from_fen(START_FEN)
+    play(second, ['b1c3', 'g8f6', 'g1f3'])
+    assert first.hash == second.hash
+
+
+def test_threefold_repetition():
+    position = Position.from_fen(START_FEN)
+    play(position, KNIGHT_SHUFFLE)
+    assert position.is_repetition(2)
+    assert not position.is_repetition()
+    play(position, KNIGHT_SHUFFLE)
+    assert position.is_repetition()
+
+
+def test_unmake_forgets_repetitions():
+    position = Position.from_fen(START_FEN)
+    play(position, KNIGHT_SHUFFLE * 2)
+    assert position.is_repetition()
+    position.unmake_move()
+    play(position, ['f6g8'])
+    assert position.is_repetition()
+    for _ in range(4):
+        position.unmake_move()
+    assert not position.is_repetition()
+    assert position.is_repetition(2)
+    for _ in range(4):
+        position.unmake_move()
+    assert position.repetitions == {position.hash: 1}
+
+
+def test_side_to_move_castling_and_en_passant_change_the_hash():
+    start = Position.from_fen(START_FEN).hash
+    assert Position.from_fen(START_FEN.replace(' w ', ' b ')).hash != start
+    assert Position.from_fen(START_FEN.replace('KQkq', 'Kkq')).hash != start
+    after_e4 = "rnbqkbnr/pppp1ppp/8/8/3pP3/8/PPP2PPP/RNBQKBNR b KQkq {} 0 3"
+    # The en passant square only counts when a pawn can actually take there
+    assert Position.from_fen(after_e4.format('e3')).hash != Position.from_fen(after_e4.format('-')).hash
+    no_taker = "rnbqkbnr/pppp1ppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq {} 0 2"
+    assert Position.from_fen(no_taker.format('e3')).hash == Position.from_fen(no_taker.format('-')).hash
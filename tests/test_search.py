@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from data.classes.Position import Position, START_FEN
+from data.classes.Search import Search, evaluate
+
+
+@pytest.mark.parametrize("fen, best_move", [
+    ("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", "a1a8"),  # back rank
+    ("r5k1/5ppp/8/8/8/8/5PPP/6K1 b - - 0 1", "a8a1"),  # the same for black
+])
+def test_finds_mate_in_one(fen, best_move):
+    move, info = Search().search(fen, depth=4)
+    assert move == best_move
+    assert info["score"] == ("mate", 1)
+    assert info["pv"] == [best_move]
+
+
+def test_finds_mate_in_two():
+    fen = "r1b2k1r/ppp1bppp/8/1B1Q4/5q2/2P5/PPP2PPP/R3R1K1 w - - 1 1"
+    move, info = Search().search(fen, depth=5)
+    assert move == "d5d8"  # Qd8+ Bxd8 Re8#
+    assert info["score"] == ("mate", 2)
+    assert info["pv"] == ["d5d8", "e7d8", "e1e8"]
+    assert info["depth"] < 5  # stops once it has the quickest mate
+
+
+@pytest.mark.parametrize("fen", [
+    "6k1/5ppp/8/8/8/8/5PPP/r5K1 w - - 0 1",  # checkmated
+    "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",  # stalemated
+])
+def test_no_move_without_legal_moves(fen):
+    assert Search().search(fen, depth=3) == (None, {})
+
+
+def test_takes_a_hanging_queen():
+    move, info = Search().search("4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1", depth=3)
+    assert move == "d2d5"
+    assert info["score"][0] == "cp" and info["score"][1] > 0
+
+
+def test_start_position_is_level():
+    assert evaluate(Position.from_fen(START_FEN)) == 0
+
+
+def test_reports_every_depth():
+    depths = []
+    Search().search(START_FEN, depth=3, on_info=lambda info: depths.append(info["depth"]))
+    assert depths == [1, 2, 3]
+
+
+def test_max_time_bounds_a_deep_search():
+    started = time.perf_counter()
+    move, info = Search(max_time=0.3).search(START_FEN, depth=30)
+    assert time.perf_counter() - started < 2
+    assert Position.from_fen(START_FEN).parse_uci(move) is not None
+    assert info["depth"] < 30
+
+
+def test_stop_ends_an_infinite_search():
+    search = Search()
+    threading.Timer(0.3, search.stop).start()
+    started = time.perf_counter()
+    move, info = search.search(START_FEN)
+    assert time.perf_counter() - started < 3
+    assert move is not None
+    assert info["depth"] >= 1
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from data.classes import Tablebase as tablebase_module
+from data.classes.Position import Position, QUEEN, ROOK
+from data.classes.Tablebase import Tablebase, ILLEGAL, describe
+
+
+@pytest.fixture(scope="module")
+def tablebase(tmp_path_factory):
+    """Both tables, generated once for the module (about 10 seconds)."""
+    tablebase = Tablebase(str(tmp_path_factory.mktemp("tablebases")))
+    tablebase.generate_missing()
+    yield tablebase
+    tablebase.close()
+
+
+@pytest.mark.parametrize("ptype, longest", [(QUEEN, 20), (ROOK, 32)])
+def test_longest_mates(tablebase, ptype, longest):
+    # Known results: KQK takes at most 10 moves to mate and KRK 16, i.e. 20 and 32 plies for the loser to move
+    table = bytes(tablebase.table(ptype))
+    assert max(value for value in table if value != ILLEGAL) - 1 == longest
+
+
+@pytest.mark.parametrize("fen, result", [
+    ("k7/8/1K6/8/8/8/7Q/8 w - - 0 1", ("win", 1)),  # Qh8# or Qb7#
+    ("k6Q/8/1K6/8/8/8/8/8 b - - 0 1", ("loss", 0)),  # checkmated
+    ("k7/8/1K6/8/8/8/8/7R w - - 0 1", ("win", 1)),  # Rh8#
+    ("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1", ("draw", 0)),  # stalemate
+    ("8/8/8/8/8/8/kR6/7K b - - 0 1", ("draw", 0)),  # the king takes the rook
+    ("8/8/8/8/8/8/kR6/2K5 b - - 0 1", ("loss", 14)),  # the rook is guarded; mated in 7
+])
+def test_probe(tablebase, fen, result):
+    assert tablebase.probe(Position.from_fen(fen)) == result
+
+
+@pytest.mark.parametrize("fen", [
+    "4k3/8/8/8/8/8/8/R3K3 w Q - 0 1",  # castling rights
+    "4k3/8/8/8/8/8/8/RR2K3 w - - 0 1",  # two rooks
+    "4k3/8/8/8/8/8/8/B3K3 w - - 0 1",  # a bishop
+    "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1",  # a pawn
+    "4k3/8/8/8/8/8/8/4K3 w - - 0 1",  # bare kings
+])
+def test_positions_the_tables_do_not_cover(tablebase, fen):
+    assert tablebase.probe(Position.from_fen(fen)) is None
+
+
+def test_best_moves_mate_in_the_promised_number_of_plies(tablebase):
+    position = Position.from_fen("8/8/3k4/8/8/8/8/R3K3 w - - 0 1")
+    outcome, plies = tablebase.probe(position)
+    assert outcome == "win"
+    played = 0
+    while position.has_legal_moves():
+        move, result = tablebase.best_move(position)
+        assert result[1] == plies - played  # both sides play perfectly, so the distance drops by one a ply
+        position.make_move(move)
+        played += 1
+    assert position.in_check()
+    assert played == plies
+
+
+def test_describe():
+    assert describe(("win", 1)) == "win, mate in 1"
+    assert describe(("loss", 20)) == "loss, mate in 10"
+    assert describe(("draw", 0)) == "draw"
+
+
+def test_probe_does_not_wait_for_generation(tablebase, tmp_path, monkeypatch):
+    tables = {QUEEN: bytes(tablebase.table(QUEEN)), ROOK: bytes(tablebase.table(ROOK))}
+    release = threading.Event()
+
+    def slow_generate(ptype):
+        release.wait(10)
+        return tables[ptype]
+    monkeypatch.setattr(tablebase_module, "generate", slow_generate)
+
+    building = Tablebase(str(tmp_path))
+    position = Position.from_fen("k7/8/1K6/8/8/8/7Q/8 w - - 0 1")
+    assert building.probe(position) is None  # starts the background build
+    assert building.builder.is_alive()
+    release.set()
+    building.builder.join(10)
+    assert building.probe(position) == ("win", 1)
+    assert (tmp_path / "KQK.bin").stat().st_size == len(tables[QUEEN])
+    # A new Tablebase maps the saved files straight away
+    reopened = Tablebase(str(tmp_path))
+    assert reopened.probe(position) == ("win", 1)
+    assert reopened.builder is None
+    reopened.close()
+    building.close()